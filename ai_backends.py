@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+class ModelBackend(ABC):
+    """ai_service'in beklediği model arayüzü (genai.GenerativeModel ile uyumlu)"""
+
+    model_name = None
+
+    @abstractmethod
+    def generate_content(self, prompt, stream=False, request_options=None):
+        """genai.GenerativeModel.generate_content ile aynı imza ve dönüş değeri"""
+
+class GeminiBackend(ModelBackend):
+    """Canlı Gemini modeli"""
+
+    def __init__(self, model_name='gemini-pro', api_key=None):
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model_name)
+        self.model_name = self._model.model_name
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        return self._model.generate_content(prompt, stream=stream, request_options=request_options)
+
+class LatencyDistribution:
+    """Sahte model için gecikme dağılımı (saniye)"""
+
+    def __init__(self, kind='lognormal', **params):
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec):
+        """'lognormal:median=1.5,sigma=0.6' biçimindeki tanımı çözümle"""
+        kind, _, rest = spec.partition(':')
+        params = {}
+        for pair in filter(None, rest.split(',')):
+            name, _, value = pair.partition('=')
+            params[name.strip()] = float(value)
+        return cls(kind.strip() or 'lognormal', **params)
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == 'constant':
+            value = p.get('value', 1.0)
+        elif self.kind == 'uniform':
+            value = rng.uniform(p.get('low', 0.5), p.get('high', 2.0))
+        elif self.kind == 'normal':
+            value = rng.gauss(p.get('mean', 1.0), p.get('stddev', 0.3))
+        else:
+            # Model gecikmeleri genellikle sağa çarpık olduğundan varsayılan lognormal
+            value = rng.lognormvariate(0, p.get('sigma', 0.5)) * p.get('median', 1.5)
+        return max(0.0, value)
+
+# Sahte yanıt senaryoları ve varsayılan olasılıkları
+DEFAULT_SCENARIOS = {
+    'valid': 0.80,
+    'fenced': 0.05,          # ```json bloğu ve süslü parantez içeren ek metin
+    'malformed_json': 0.03,
+    'truncated': 0.03,
+    'invalid_question': 0.03,
+    'empty': 0.02,
+    'unavailable': 0.02,
+    'quota': 0.02,
+}
+
+def parse_scenarios(spec):
+    """'valid=0.9,empty=0.1' biçimindeki senaryo ağırlıklarını çözümle"""
+    scenarios = {}
+    for pair in filter(None, spec.split(',')):
+        name, _, weight = pair.partition('=')
+        scenarios[name.strip()] = float(weight)
+    return scenarios
+
+class _FakeUsage:
+    def __init__(self, total_token_count):
+        self.total_token_count = total_token_count
+
+class _FakeResponse:
+    def __init__(self, text, total_tokens):
+        self.text = text
+        self.usage_metadata = _FakeUsage(total_tokens)
+
+class FakeModelBackend(ModelBackend):
+    """Yük testleri için çevrimdışı Gemini yerine geçen sahte model"""
+
+    model_name = 'fake-gemini'
+
+    def __init__(self, latency=None, scenarios=None, seed=None, stream_chunks=8):
+        self.latency = latency or LatencyDistribution()
+        self.scenarios = scenarios or dict(DEFAULT_SCENARIOS)
+        self.stream_chunks = stream_chunks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def _pick(self):
+        with self._lock:
+            names = list(self.scenarios)
+            scenario = self._rng.choices(names, weights=[self.scenarios[n] for n in names])[0]
+            latency = self.latency.sample(self._rng)
+            self.counters[scenario] = self.counters.get(scenario, 0) + 1
+            return scenario, latency, self._rng.random()
+
+    def reset_counters(self):
+        with self._lock:
+            self.counters = {}
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        scenario, latency, noise = self._pick()
+        timeout = (request_options or {}).get('timeout')
+
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise google_exceptions.DeadlineExceeded("Sahte model zaman aşımı")
+
+        if scenario == 'unavailable':
+            time.sleep(latency * 0.2)
+            raise google_exceptions.ServiceUnavailable("Sahte model kullanılamıyor")
+        if scenario == 'quota':
+            time.sleep(latency * 0.05)
+            raise google_exceptions.ResourceExhausted("Sahte model kota aşıldı")
+
+        text = self._render(prompt, scenario, noise)
+        total_tokens = (len(prompt) + len(text)) // 3
+
+        if stream:
+            return self._stream(text, latency, total_tokens)
+        time.sleep(latency)
+        return _FakeResponse(text, total_tokens)
+
+    def _stream(self, text, latency, total_tokens):
+        size = max(1, len(text) // self.stream_chunks)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or ['']
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            yield _FakeResponse(piece, total_tokens)
+
+    def _render(self, prompt, scenario, noise):
+        if scenario == 'empty':
+            return ''
+
+        match = re.search(r'(\d+) adet soru', prompt)
+        if not match:
+            return self._curriculum(prompt)
+
+        questions = [self._question(i) for i in range(int(match.group(1)))]
+        if scenario == 'invalid_question' and questions:
+            questions[int(noise * len(questions))]['options'].pop()
+        text = json.dumps({'questions': questions}, ensure_ascii=False, indent=2)
+
+        if scenario == 'fenced':
+            return f"İşte sorular:\n```json\n{text}\n```\nNot: {{yukarıdaki}} sorular müfredata göredir."
+        if scenario == 'malformed_json':
+            return text.replace('",', '"', 1)
+        if scenario == 'truncated':
+            return text[:int(len(text) * (0.4 + noise * 0.5))]
+        return text
+
+    def _question(self, index):
+        token = uuid.uuid4().hex[:8]
+        options = [f"{letter}) Seçenek {letter} {token}" for letter in 'ABCD']
+        return {
+            'question': f"Soru {index + 1} ({token}): Aşağıdakilerden hangisi doğrudur?",
+            'options': options,
+            'correct_answer': options[index % 4],
+            'topic': f"Konu {index % 3 + 1}",
+            'difficulty': ('kolay', 'orta', 'zor')[index % 3],
+        }
+
+    def _curriculum(self, prompt):
+        sections = ['Öğrenme Hedefleri', 'Ana Kavramlar', 'Pratik Alıştırmalar', 'Değerlendirme Kriterleri']
+        body = '\n\n'.join(f"## {title}\n\n" + '\n'.join(f"- {title} maddesi {i + 1}" for i in range(6))
+                           for title in sections)
+        return f"# Müfredat\n\n{body}\n"
+
+def create_backend(config):
+    """AI_BACKEND ayarına göre model arka ucunu oluştur ('gemini' veya 'fake')"""
+    kind = config.get('AI_BACKEND') or os.environ.get('AI_BACKEND', 'gemini')
+    if kind == 'fake':
+        latency = config.get('AI_FAKE_LATENCY') or os.environ.get('AI_FAKE_LATENCY')
+        scenarios = config.get('AI_FAKE_SCENARIOS') or os.environ.get('AI_FAKE_SCENARIOS')
+        seed = config.get('AI_FAKE_SEED') or os.environ.get('AI_FAKE_SEED')
+        return FakeModelBackend(
+            latency=LatencyDistribution.parse(latency) if latency else None,
+            scenarios=parse_scenarios(scenarios) if scenarios else None,
+            seed=int(seed) if seed else None,
+        )
+    return GeminiBackend(
+        model_name=config.get('GEMINI_MODEL') or os.environ.get('GEMINI_MODEL', 'gemini-pro'),
+        api_key=os.environ.get('GEMINI_API_KEY'),
+    )
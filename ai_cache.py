@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.exc import IntegrityError
+from models import db, AIResponseCache
+
+def normalize_prompt(prompt: str) -> str:
+    """Aynı istemin boşluk farklarından dolayı farklı anahtar üretmesini engelle"""
+    return ' '.join(prompt.split())
+
+def make_cache_key(prompt: str, model_name: str) -> str:
+    """Model adı ve normalize edilmiş istemden içerik adresli anahtar üret"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_prompt(prompt).encode('utf-8'))
+    return digest.hexdigest()
+
+class CacheStats:
+    """Önbellek isabet/ıska sayaçları"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        counters['hit_rate'] = counters.get('hits', 0) / lookups if lookups else 0
+        return counters
+
+class MemoryCache:
+    """TTL destekli, boyutu sınırlı LRU bellek katmanı"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, model_name=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class DatabaseCache:
+    """Süreçler ve yeniden başlatmalar arasında paylaşılan veritabanı katmanı"""
+
+    name = 'database'
+
+    def __init__(self, max_entries=10000, ttl=7 * 24 * 3600, prune_every=50):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.table = AIResponseCache.__table__
+
+    def get(self, key):
+        now = datetime.utcnow()
+        # İstek oturumunu etkilememek için ayrı bir bağlantı kullan
+        with db.engine.begin() as conn:
+            value = conn.execute(
+                select(self.table.c.response).where(
+                    self.table.c.key == key,
+                    self.table.c.expires_at > now
+                )
+            ).scalar()
+            if value is not None:
+                conn.execute(
+                    update(self.table)
+                    .where(self.table.c.key == key)
+                    .values(last_used_at=now, hits=self.table.c.hits + 1)
+                )
+        return value
+
+    def set(self, key, value, model_name=None):
+        now = datetime.utcnow()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(self.table).where(self.table.c.key == key))
+                conn.execute(self.table.insert().values(
+                    key=key,
+                    model_name=model_name or '',
+                    response=value,
+                    created_at=now,
+                    last_used_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl),
+                    hits=0
+                ))
+        except IntegrityError:
+            # Aynı anahtarı başka bir süreç yazmış; sonuç aynı olduğundan yok say
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_every == 0
+        if should_prune:
+            self.prune()
+
+    def delete(self, key):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.key == key))
+
+    def prune(self):
+        """Süresi dolan kayıtları ve boyut sınırını aşan en eski kayıtları sil"""
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= datetime.utcnow()))
+            total = conn.execute(select(func.count()).select_from(self.table)).scalar()
+            overflow = total - self.max_entries
+            if overflow > 0:
+                stale_keys = select(self.table.c.key)\
+                    .order_by(self.table.c.last_used_at)\
+                    .limit(overflow)\
+                    .scalar_subquery()
+                conn.execute(delete(self.table).where(self.table.c.key.in_(stale_keys)))
+
+    def clear(self):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table))
+
+class ResponseCache:
+    """Katmanlı (bellek + veritabanı) AI yanıt önbelleği"""
+
+    def __init__(self, tiers=None):
+        self.tiers = tiers or []
+        self.enabled = True
+        self.stats = CacheStats()
+
+    def init_app(self, app, tiers=None):
+        config = app.config
+        self.enabled = str(config.get('AI_CACHE_ENABLED', os.environ.get('AI_CACHE_ENABLED', '1'))) not in ('0', 'false', 'False')
+        ttl = int(config.get('AI_CACHE_TTL') or os.environ.get('AI_CACHE_TTL', 7 * 24 * 3600))
+        if tiers is None:
+            tiers = [
+                MemoryCache(
+                    max_entries=int(config.get('AI_CACHE_MEMORY_SIZE') or os.environ.get('AI_CACHE_MEMORY_SIZE', 512)),
+                    ttl=ttl
+                ),
+                DatabaseCache(
+                    max_entries=int(config.get('AI_CACHE_DB_SIZE') or os.environ.get('AI_CACHE_DB_SIZE', 10000)),
+                    ttl=ttl
+                ),
+            ]
+        self.tiers = tiers
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        for index, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception:
+                self.stats.incr('errors')
+                continue
+            if value is not None:
+                self.stats.incr('hits')
+                self.stats.incr(f'{tier.name}_hits')
+                # Alt katmandaki isabeti üst katmanlara taşı
+                for upper in self.tiers[:index]:
+                    upper.set(key, value)
+                return value
+        self.stats.incr('misses')
+        return None
+
+    def set(self, key, value, model_name=None):
+        if not self.enabled:
+            return
+        for tier in self.tiers:
+            try:
+                tier.set(key, value, model_name=model_name)
+            except Exception:
+                self.stats.incr('errors')
+
+    def delete(self, key):
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+response_cache = ResponseCache()
+
+def init_app(app):
+    response_cache.init_app(app)
@@ -0,0 +1,124 @@
+import json
+import re
+
+class JSONExtractionError(ValueError):
+    """Yanıttan JSON nesnesi çıkarılamadı"""
+
+    def __init__(self, message, position=None, truncated=False):
+        super().__init__(message)
+        self.position = position
+        self.truncated = truncated
+
+class QuestionError:
+    """Tek bir sorunun şema doğrulama hatası"""
+
+    __slots__ = ('index', 'field', 'message')
+
+    def __init__(self, index, field, message):
+        self.index = index
+        self.field = field
+        self.message = message
+
+    def __repr__(self):
+        return f"QuestionError(index={self.index}, field={self.field!r}, message={self.message!r})"
+
+    def __str__(self):
+        return f"{self.index + 1}. soru ({self.field}): {self.message}"
+
+# Yalnızca yapısal karakterlerde dur; dizge gövdeleri tek seferde atlanır
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+def _scan(text, start):
+    """start konumundaki '{' ile dengelenen '}' konumunu bul
+
+    Dizgeler ve kaçış karakterleri dikkate alınır. Nesne kapanmadan metin biterse
+    (kesik yanıt) -1 ile birlikte, kökteki 'questions' dizisinde tamamlanmış son
+    öğenin bitiş konumu döner.
+    """
+    depth = 0
+    last_complete_item = -1
+    pos = start
+    while True:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            return -1, last_complete_item
+        i = match.start()
+        ch = text[i]
+        if ch == '"':
+            rest = _STRING_REST.match(text, i + 1)
+            if rest is None:
+                return -1, last_complete_item
+            pos = rest.end()
+            continue
+        if ch == '{' or ch == '[':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return i, last_complete_item
+            if depth == 2 and ch == '}':
+                # {"questions": [ {...} ] } içinde tamamlanan bir soru nesnesi
+                last_complete_item = i
+        pos = i + 1
+
+_decoder = json.JSONDecoder()
+
+def extract_json_object(response_text: str):
+    """Yanıttaki ilk dengeli JSON nesnesini bul ve ayrıştır; (veri, kesik_mi) döndür
+
+    Ayrıştırma ilk '{' konumundan tek geçişte yapılır; markdown kod blokları ve
+    nesneden sonraki açıklama metinleri (süslü parantez içerse bile) yok sayılır.
+    Kesik yanıtlarda tamamlanmış sorular kurtarılabiliyorsa onlarla bir nesne döner.
+    """
+    start = response_text.find('{')
+    while start != -1:
+        try:
+            return _decoder.raw_decode(response_text, start)[0], False
+        except json.JSONDecodeError:
+            pass
+
+        end, last_item = _scan(response_text, start)
+        if end != -1:
+            # Kapanan ama geçersiz bir parça ('{yukarıdaki}' gibi); sonrakine geç
+            start = response_text.find('{', end + 1)
+            continue
+
+        if last_item != -1:
+            # Kesik yanıt: tamamlanmış soruları kapatıp kurtar
+            try:
+                return json.loads(response_text[start:last_item + 1] + ']}'), True
+            except json.JSONDecodeError:
+                pass
+        raise JSONExtractionError("Yanıt yarıda kesilmiş; JSON nesnesi kapanmıyor",
+                                  position=start, truncated=True)
+
+    raise JSONExtractionError("Yanıtta JSON nesnesi bulunamadı")
+
+VALID_PREFIXES = ('A)', 'B)', 'C)', 'D)')
+
+def validate_questions(data):
+    """Soru listesini tek geçişte doğrula; (geçerli sorular, hatalar) döndür"""
+    if not isinstance(data, dict) or not isinstance(data.get('questions'), list):
+        return [], [QuestionError(-1, 'questions', "yanıt 'questions' listesi içermiyor")]
+
+    valid = []
+    errors = []
+    for index, q in enumerate(data['questions']):
+        if not isinstance(q, dict):
+            errors.append(QuestionError(index, 'question', "soru bir nesne değil"))
+            continue
+        text = q.get('question')
+        options = q.get('options')
+        answer = q.get('correct_answer')
+        if not isinstance(text, str) or not text.strip():
+            errors.append(QuestionError(index, 'question', "soru metni eksik"))
+        elif not isinstance(options, list) or len(options) != 4:
+            errors.append(QuestionError(index, 'options', "tam olarak 4 seçenek içermiyor"))
+        elif not all(isinstance(opt, str) and opt.startswith(VALID_PREFIXES) for opt in options):
+            errors.append(QuestionError(index, 'options', "seçenekler A), B), C), D) ile başlamalıdır"))
+        elif answer not in options:
+            errors.append(QuestionError(index, 'correct_answer', "doğru cevap seçenekler arasında değil"))
+        else:
+            valid.append(q)
+    return valid, errors
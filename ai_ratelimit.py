@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_BACKGROUND: 'background',
+}
+
+class RateLimitTimeout(Exception):
+    """İstek, izin verilen süre içinde model çağrı sırasına giremedi"""
+    pass
+
+def estimate_tokens(text: str) -> int:
+    """Türkçe metin için kaba token tahmini (~3 karakter/token)"""
+    return max(1, len(text) // 3)
+
+class TokenBucket:
+    """Dakika başına sabit hızla dolan token kovası"""
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def wait_time(self, amount):
+        """amount token için beklenmesi gereken süre (saniye); 0 ise hemen alınabilir"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Tahmin ile gerçek kullanım arasındaki farkı düş (borçlanabilir)"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+    @property
+    def available(self):
+        self._refill()
+        return self._tokens
+
+class _Ticket:
+    """Sıradaki tek bir model çağrısı"""
+
+    __slots__ = ('owner', 'priority', 'tokens', 'enqueued_at', 'granted_at')
+
+    def __init__(self, owner, priority, tokens, enqueued_at):
+        self.owner = owner
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = enqueued_at
+        self.granted_at = None
+
+class ModelRateLimiter:
+    """İstek/dakika ve token/dakika kovaları, eşzamanlılık sınırı ve adil sıralama"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=120000, max_concurrency=4,
+                 clock=time.monotonic):
+        self._clock = clock
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self.max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        # öncelik -> sahip -> bekleyen biletler; sahipler arasında sırayla ilerlenir
+        self._lanes = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self._wait_samples = {priority: deque(maxlen=500) for priority in PRIORITY_NAMES}
+        self._counters = {'granted': 0, 'timeouts': 0}
+
+    def configure(self, config):
+        def _setting(name, default):
+            return int(config.get(name) or os.environ.get(name, default))
+
+        with self._cond:
+            self.requests = TokenBucket(_setting('AI_RATE_LIMIT_RPM', 60), clock=self._clock)
+            self.tokens = TokenBucket(_setting('AI_RATE_LIMIT_TPM', 120000), clock=self._clock)
+            self.max_concurrency = _setting('AI_MAX_CONCURRENCY', 4)
+            self._cond.notify_all()
+
+    def _head(self):
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            if lane:
+                return next(iter(lane.values()))[0]
+        return None
+
+    def _admission_delay(self, ticket):
+        if self._in_flight >= self.max_concurrency:
+            return None
+        return max(self.requests.wait_time(1), self.tokens.wait_time(ticket.tokens))
+
+    def _dequeue(self, ticket):
+        lane = self._lanes[ticket.priority]
+        tickets = lane.get(ticket.owner)
+        if not tickets:
+            return
+        was_head = tickets[0] is ticket
+        tickets.remove(ticket)
+        if not tickets:
+            del lane[ticket.owner]
+        elif was_head:
+            # Aynı öğretmenin sıradaki isteği diğer öğretmenlerden sonra gelsin
+            lane.move_to_end(ticket.owner)
+
+    def acquire(self, owner=None, priority=PRIORITY_INTERACTIVE, tokens=1, timeout=None):
+        with self._cond:
+            now = self._clock()
+            ticket = _Ticket(owner, priority, tokens, now)
+            self._lanes[priority].setdefault(owner, deque()).append(ticket)
+            deadline = now + timeout if timeout is not None else None
+
+            while True:
+                delay = self._admission_delay(ticket) if self._head() is ticket else None
+                if delay == 0:
+                    self._dequeue(ticket)
+                    self.requests.consume(1)
+                    self.tokens.consume(tokens)
+                    self._in_flight += 1
+                    ticket.granted_at = self._clock()
+                    self._wait_samples[priority].append(ticket.granted_at - ticket.enqueued_at)
+                    self._counters['granted'] += 1
+                    self._cond.notify_all()
+                    return ticket
+
+                if deadline is not None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._dequeue(ticket)
+                        self._counters['timeouts'] += 1
+                        self._cond.notify_all()
+                        raise RateLimitTimeout("AI model çağrı sırası zaman aşımına uğradı")
+                    delay = remaining if delay is None else min(delay, remaining)
+                self._cond.wait(delay)
+
+    def release(self, ticket, actual_tokens=None):
+        with self._cond:
+            self._in_flight -= 1
+            if actual_tokens is not None:
+                self.tokens.adjust(actual_tokens - ticket.tokens)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, owner=None, priority=PRIORITY_INTERACTIVE, tokens=1, timeout=None):
+        ticket = self.acquire(owner, priority, tokens, timeout)
+        usage = {}
+        try:
+            yield usage
+        finally:
+            self.release(ticket, usage.get('total_tokens'))
+
+    def stats(self):
+        with self._cond:
+            lanes = {}
+            for priority, name in PRIORITY_NAMES.items():
+                waits = sorted(self._wait_samples[priority])
+                lanes[name] = {
+                    'queue_depth': sum(len(tickets) for tickets in self._lanes[priority].values()),
+                    'waiting_owners': len(self._lanes[priority]),
+                    'avg_wait': sum(waits) / len(waits) if waits else 0,
+                    'p95_wait': waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0,
+                    'max_wait': waits[-1] if waits else 0,
+                }
+            return {
+                'in_flight': self._in_flight,
+                'max_concurrency': self.max_concurrency,
+                'requests_available': round(self.requests.available, 2),
+                'tokens_available': round(self.tokens.available, 2),
+                'granted': self._counters['granted'],
+                'timeouts': self._counters['timeouts'],
+                'lanes': lanes,
+            }
@@ -0,0 +1,270 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from google.api_core import exceptions as google_exceptions
+
+RETRYABLE = 'retryable'
+TERMINAL = 'terminal'
+
+# Geçici üst akış hataları: tekrar denemek anlamlıdır ve devre kesiciye sayılır
+UPSTREAM_RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+
+class RetryError(Exception):
+    """Yeniden deneme motorunun çağrıyı sonlandırdığını belirten temel hata"""
+
+    def __init__(self, message, last_error=None, attempts=0):
+        super().__init__(message)
+        self.last_error = last_error
+        self.attempts = attempts
+
+class RetryExhausted(RetryError):
+    """Tüm deneme hakları tükendi"""
+
+class RetryBudgetExceeded(RetryError):
+    """İstek başına gecikme bütçesi aşıldı"""
+
+class CircuitOpenError(RetryError):
+    """Devre kesici açık; üst akış çağrılmadan hızlıca başarısız olundu"""
+
+class RetryPolicy:
+    """Deneme sayısı, üstel geri çekilme ve toplam gecikme bütçesi"""
+
+    def __init__(self, max_attempts=3, initial_delay=1.0, max_delay=8.0, multiplier=2.0,
+                 budget=45.0, jitter=True):
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.budget = budget
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        """attempt. başarısız denemeden sonra beklenecek süre (tam jitter)"""
+        delay = min(self.max_delay, self.initial_delay * (self.multiplier ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+class ErrorClassifier:
+    """Hataları yeniden denenebilir / kalıcı olarak sınıflandır"""
+
+    def __init__(self, retryable_types=UPSTREAM_RETRYABLE_ERRORS, invalid_response_types=()):
+        self.retryable_types = tuple(retryable_types)
+        self.invalid_response_types = tuple(invalid_response_types)
+
+    def classify(self, error):
+        if isinstance(error, self.retryable_types + self.invalid_response_types):
+            return RETRYABLE
+        return TERMINAL
+
+    def is_upstream_failure(self, error):
+        """Devre kesicinin hata oranına yalnızca üst akış kaynaklı hatalar girer"""
+        return isinstance(error, self.retryable_types)
+
+class CircuitBreaker:
+    """Kayan penceredeki hata oranı yüksekse üst akışa istek göndermeyi durdur"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, error_rate=0.5, min_calls=10, window=50, cooldown=30.0, clock=time.monotonic):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    def allow(self):
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                # Yarı açık durumda tek bir deneme isteğine izin ver
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+                self._trip()
+
+    def release(self):
+        """Sonucu üst akışın durumunu göstermeyen deneme; durumu değiştirmeden deneme hakkını geri ver"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self._outcomes.clear()
+
+class RetryMetrics:
+    """Çağrı başına deneme sayısı ve sonuç sayaçları"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.attempts = 0
+            self.attempts_per_call = {}
+            self.outcomes = {}
+            self.errors = {}
+
+    def record_attempt_error(self, error):
+        with self._lock:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def record_call(self, attempts, outcome):
+        with self._lock:
+            self.calls += 1
+            self.attempts += attempts
+            self.attempts_per_call[attempts] = self.attempts_per_call.get(attempts, 0) + 1
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'avg_attempts': self.attempts / self.calls if self.calls else 0,
+                'attempts_per_call': dict(self.attempts_per_call),
+                'outcomes': dict(self.outcomes),
+                'errors': dict(self.errors),
+            }
+
+class RetryEngine:
+    """Sınıflandırma, geri çekilme, bütçe ve devre kesiciyi birleştiren yeniden deneme motoru"""
+
+    def __init__(self, policy=None, classifier=None, breaker=None, metrics=None,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.policy = policy or RetryPolicy()
+        self.classifier = classifier or ErrorClassifier()
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.metrics = metrics or RetryMetrics()
+        self._sleep = sleep
+        self._clock = clock
+
+    def call(self, fn, policy=None, on_retry=None):
+        """fn(kalan_bütçe_saniye) çağrısını politika sınırları içinde çalıştır"""
+        policy = policy or self.policy
+        deadline = self._clock() + policy.budget
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                self.metrics.record_call(attempt, 'circuit_open')
+                raise CircuitOpenError("AI servisi devre kesicisi açık", attempts=attempt)
+
+            attempt += 1
+            remaining = deadline - self._clock()
+            error = None
+            upstream_ok = None
+            try:
+                result = fn(remaining)
+                upstream_ok = True
+            except Exception as e:
+                error = e
+                if self.classifier.is_upstream_failure(e):
+                    upstream_ok = False
+            finally:
+                # Kendi hatalarımız (ör. ayrıştırma) ve BaseException (zaman aşımı, iptal) üst
+                # akış hakkında bilgi vermez; yarı açık deneme hakkı yalnızca geri verilir
+                if upstream_ok is True:
+                    self.breaker.record_success()
+                elif upstream_ok is False:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+
+            if error is not None:
+                self.metrics.record_attempt_error(error)
+
+                if self.classifier.classify(error) == TERMINAL:
+                    self.metrics.record_call(attempt, 'terminal')
+                    raise error
+
+                if attempt >= policy.max_attempts:
+                    self.metrics.record_call(attempt, 'exhausted')
+                    raise RetryExhausted(
+                        f"{attempt} denemeden sonra başarısız oldu: {str(error)}",
+                        last_error=error, attempts=attempt
+                    ) from error
+
+                delay = policy.backoff(attempt)
+                if self._clock() + delay >= deadline:
+                    self.metrics.record_call(attempt, 'budget_exceeded')
+                    raise RetryBudgetExceeded(
+                        f"{policy.budget:.0f} saniyelik gecikme bütçesi aşıldı: {str(error)}",
+                        last_error=error, attempts=attempt
+                    ) from error
+
+                if on_retry:
+                    on_retry(attempt, error, delay)
+                self._sleep(delay)
+                continue
+
+            self.metrics.record_call(attempt, 'success')
+            return result
+
+    def configure(self, config):
+        """Uygulama yapılandırmasından politika ve devre kesici ayarlarını oku"""
+        def _setting(name, default, cast=float):
+            return cast(config.get(name) or os.environ.get(name, default))
+
+        self.policy = RetryPolicy(
+            max_attempts=_setting('AI_RETRY_MAX_ATTEMPTS', 3, int),
+            initial_delay=_setting('AI_RETRY_INITIAL_DELAY', 1.0),
+            max_delay=_setting('AI_RETRY_MAX_DELAY', 8.0),
+            budget=_setting('AI_RETRY_BUDGET', 45.0),
+        )
+        self.breaker = CircuitBreaker(
+            error_rate=_setting('AI_CIRCUIT_ERROR_RATE', 0.5),
+            min_calls=_setting('AI_CIRCUIT_MIN_CALLS', 10, int),
+            cooldown=_setting('AI_CIRCUIT_COOLDOWN', 30.0),
+            clock=self._clock,
+        )
@@ -1,19 +1,173 @@
 import os
+import copy
 import json
-import logging
 import re
-import google.generativeai as genai
-from google.api_core import retry
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from flask import current_app
+from ai_cache import response_cache, make_cache_key
+from ai_retry import RetryEngine, ErrorClassifier, RetryError, RetryExhausted, CircuitOpenError
+from ai_json import extract_json_object, validate_questions, JSONExtractionError
+from ai_ratelimit import ModelRateLimiter, RateLimitTimeout, PRIORITY_INTERACTIVE, estimate_tokens
 
 class AIServiceError(Exception):
     """AI servisi için özel hata sınıfı"""
     pass
 
-def generate_curriculum_content(topic: str, level: str = "intermediate") -> str:
-    """Gemini AI kullanarak müfredat içeriği oluştur ve hata yönetimini sağla"""
+class InvalidResponseError(AIServiceError):
+    """Model yanıt verdi ancak yanıt boş veya beklenen biçimde değil; yeniden denenebilir"""
+    pass
+
+retry_engine = RetryEngine(classifier=ErrorClassifier(invalid_response_types=(InvalidResponseError,)))
+rate_limiter = ModelRateLimiter()
+
+# Yanıt uzunluğu tahminleri (token/dakika kovası için)
+CURRICULUM_OUTPUT_TOKENS = 2000
+QUESTION_OUTPUT_TOKENS = 150
+
+def init_app(app):
+    retry_engine.configure(app.config)
+    rate_limiter.configure(app.config)
+
+def get_stats() -> dict:
+    """AI katmanının önbellek, sıra, yeniden deneme ve birleştirme ölçümleri"""
+    return {
+        'cache': response_cache.stats.snapshot(),
+        'rate_limiter': rate_limiter.stats(),
+        'retry': retry_engine.metrics.snapshot(),
+        'circuit_breaker': retry_engine.breaker.state,
+        'single_flight': dict(_single_flight.stats, in_flight=_single_flight.in_flight()),
+    }
+
+class _InFlightCall:
+    """Devam eden tek bir üst akış çağrısı ve sonucunu bekleyenler"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Aynı anahtar için eşzamanlı çağrıları tek bir üst akış çağrısında birleştir"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'leaders': 0, 'coalesced': 0, 'timeouts': 0}
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.stats['leaders'] += 1
+            else:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                # Greenlet sonlandırması veya KeyboardInterrupt da kaydedilir; bekleyenler
+                # boş sonucu geçerli bir yanıt sanmasın
+                call.error = e
+                raise
+            else:
+                with self._lock:
+                    self._calls.pop(key, None)
+                # Lider sonucu değiştirebilir; bekleyenler ondan ayrılmış bir kopyadan kopyalar
+                if call.waiters:
+                    call.result = copy.deepcopy(result)
+                return result
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise AIServiceError("Aynı istek için devam eden AI çağrısı zaman aşımına uğradı")
+        if call.error is not None:
+            if not isinstance(call.error, Exception):
+                # Liderin kesilmesi bekleyenin iş parçacığını sonlandırmamalı
+                raise AIServiceError("Aynı istek için devam eden AI çağrısı yarıda kesildi") from call.error
+            # Her bekleyen kendi hata nesnesini alsın; traceback'ler iş parçacıkları arasında karışmasın
+            raise copy.copy(call.error) from call.error
+        return copy.deepcopy(call.result)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+_single_flight = SingleFlight()
+
+def _singleflight_timeout():
+    return float(current_app.config.get('AI_SINGLEFLIGHT_TIMEOUT') or os.environ.get('AI_SINGLEFLIGHT_TIMEOUT', 120))
+
+def _coalesce(key, fn):
+    return _single_flight.do(key, fn, timeout=_singleflight_timeout())
+
+def _log_retry(attempt, error, delay):
+    current_app.logger.warning(
+        f"AI çağrısı başarısız, {delay:.1f} sn sonra yeniden deneniyor (Deneme {attempt}/{retry_engine.policy.max_attempts}): {str(error)}"
+    )
+
+def _call_with_retry(attempt_fn, deadline=None):
+    """attempt_fn(kalan_süre) çağrısını yeniden deneme motoru üzerinden çalıştır
+
+    deadline (time.monotonic) verilirse gecikme bütçesi o ana kadar kalan süreyle sınırlanır.
+    """
+    policy = None
+    if deadline is not None:
+        policy = copy.copy(retry_engine.policy)
+        policy.budget = min(policy.budget, deadline - time.monotonic())
+        if policy.budget <= 0:
+            raise AIServiceError("AI yanıtı zamanında alınamadı")
     try:
-        prompt = f"""Lütfen aşağıdaki {level} seviyesinde {topic} konusu için detaylı bir müfredat oluşturun.
+        return retry_engine.call(attempt_fn, policy=policy, on_retry=_log_retry)
+    except CircuitOpenError:
+        raise AIServiceError("AI servisi şu anda yoğun. Lütfen birkaç dakika sonra tekrar deneyin.")
+    except RetryExhausted as e:
+        if isinstance(e.last_error, AIServiceError):
+            raise e.last_error
+        raise AIServiceError(f"AI servisine ulaşılamadı: {str(e.last_error)}")
+    except RetryError as e:
+        raise AIServiceError(f"AI yanıtı zamanında alınamadı: {str(e.last_error)}")
+    except RateLimitTimeout:
+        raise AIServiceError("AI servisi şu anda yoğun. Lütfen birkaç dakika sonra tekrar deneyin.")
+
+def _generate_text(prompt: str, timeout: float, owner_id=None, priority=PRIORITY_INTERACTIVE,
+                   output_tokens: int = 0) -> str:
+    """Hız sınırlayıcıdan sıra alarak modeli tek bir kez çağır ve boş olmayan yanıt metnini döndür"""
+    started = time.monotonic()
+    with rate_limiter.slot(owner_id, priority, estimate_tokens(prompt) + output_tokens, timeout=timeout) as usage:
+        remaining = timeout - (time.monotonic() - started)
+        response = _get_model().generate_content(prompt, request_options={'timeout': max(remaining, 1.0)})
+        usage_metadata = getattr(response, 'usage_metadata', None)
+        if usage_metadata is not None and getattr(usage_metadata, 'total_token_count', None):
+            usage['total_tokens'] = usage_metadata.total_token_count
+    if not response or not response.text:
+        raise InvalidResponseError("Gemini AI'dan boş yanıt alındı")
+    return response.text
+
+def _get_model():
+    return current_app.config['GENAI_MODEL']
+
+def _model_name(model) -> str:
+    return getattr(model, 'model_name', None) or 'gemini-pro'
+
+def _cache_key(prompt: str) -> str:
+    return make_cache_key(prompt, _model_name(_get_model()))
+
+def build_curriculum_prompt(topic: str, level: str) -> str:
+    """Müfredat üretimi için istem metnini oluştur"""
+    return f"""Lütfen aşağıdaki {level} seviyesinde {topic} konusu için detaylı bir müfredat oluşturun.
         Şunları içermelidir:
         - Öğrenme hedefleri
         - Ana kavramlar
@@ -22,50 +176,110 @@ def generate_curriculum_content(topic: str, level: str = "intermediate") -> str:
         Yanıtı markdown formatında verin.
         
         Not: Tüm içerik Türkçe olmalıdır."""
+
+def generate_curriculum_content(topic: str, level: str = "intermediate", use_cache: bool = True,
+                                owner_id=None, priority=PRIORITY_INTERACTIVE) -> str:
+    """Gemini AI kullanarak müfredat içeriği oluştur ve hata yönetimini sağla"""
+    try:
+        prompt = build_curriculum_prompt(topic, level)
+        cache_key = _cache_key(prompt)
         
-        @retry.Retry(predicate=retry.if_exception_type(Exception))
-        def _generate_with_retry():
-            response = current_app.config['GENAI_MODEL'].generate_content(prompt)
-            if not response or not response.text:
-                raise AIServiceError("Gemini AI'dan boş yanıt alındı")
-            return response.text
+        if use_cache:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        def _generate_and_store():
+            content = _call_with_retry(lambda remaining: _generate_text(
+                prompt, remaining, owner_id, priority, CURRICULUM_OUTPUT_TOKENS))
+            response_cache.set(cache_key, content, model_name=_model_name(_get_model()))
+            return content
             
-        return _generate_with_retry()
+        # Aynı istem için eşzamanlı çağrılar tek bir Gemini isteğini paylaşır
+        return _coalesce(cache_key, _generate_and_store)
         
     except Exception as e:
         current_app.logger.error(f"Müfredat içeriği oluşturulurken hata: {str(e)}")
         raise AIServiceError(f"Müfredat oluşturulamadı: {str(e)}")
 
-def clean_json_response(response_text: str) -> str:
-    """AI yanıtından JSON temizle ve ayıkla"""
-    # Hata ayıklama için ham yanıtı logla
-    current_app.logger.debug(f"Ham AI Yanıtı:\n{response_text}")
+def _chunk_text(chunk) -> str:
+    # Akışın son parçası metin içermeyebilir; bu durumda .text ValueError fırlatır
+    try:
+        return chunk.text or ''
+    except ValueError:
+        return ''
+
+def stream_curriculum_content(topic: str, level: str = "intermediate", use_cache: bool = True,
+                              owner_id=None, priority=PRIORITY_INTERACTIVE):
+    """Müfredat içeriğini Gemini akış API'si ile parça parça üret"""
+    prompt = build_curriculum_prompt(topic, level)
+    cache_key = _cache_key(prompt)
     
-    # Markdown kod bloklarını kaldır
-    text = re.sub(r'```(?:json)?\n?(.*?)\n```', r'\1', response_text, flags=re.DOTALL)
+    if use_cache:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
     
-    # JSON yapısını bul
-    match = re.search(r'({[\s\S]*})', text)
-    if match:
-        text = match.group(1)
+    def _open_stream(remaining):
+        # İlk parça gelene kadarki hatalar yeniden denenebilir; sonrası denenemez
+        started = time.monotonic()
+        ticket = rate_limiter.acquire(owner_id, priority,
+                                      estimate_tokens(prompt) + CURRICULUM_OUTPUT_TOKENS, timeout=remaining)
+        try:
+            remaining -= time.monotonic() - started
+            response = _get_model().generate_content(
+                prompt, stream=True, request_options={'timeout': max(remaining, 1.0)})
+            chunks = iter(response)
+            first_text = ''
+            while not first_text:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise InvalidResponseError("Gemini AI'dan boş yanıt alındı")
+                first_text = _chunk_text(chunk)
+            return ticket, first_text, chunks
+        except BaseException:
+            rate_limiter.release(ticket)
+            raise
     
-    # JSON olmayan metinleri baştan ve sondan temizle
-    text = text.strip()
+    ticket, first_text, chunks = _call_with_retry(_open_stream)
+    parts = [first_text]
+    try:
+        yield first_text
+        for chunk in chunks:
+            text = _chunk_text(chunk)
+            if text:
+                parts.append(text)
+                yield text
+    except GeneratorExit:
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Müfredat akışı yarıda kesildi: {str(e)}")
+        raise AIServiceError(f"Müfredat oluşturulamadı: {str(e)}")
+    finally:
+        rate_limiter.release(ticket)
     
-    current_app.logger.debug(f"Temizlenmiş JSON Yanıtı:\n{text}")
-    return text
+    # Yalnızca tamamlanan akışlar önbelleğe alınır
+    response_cache.set(cache_key, ''.join(parts), model_name=_model_name(_get_model()))
 
-def generate_quiz_questions(curriculum_content: str, num_questions: int = 5) -> list:
-    """Gelişmiş hata yönetimi ve JSON doğrulama ile quiz soruları oluştur"""
-    try:
-        prompt = f"""Lütfen aşağıdaki müfredata göre {num_questions} adet soru oluşturun:
+def build_quiz_prompt(curriculum_content: str, num_questions: int, part: tuple = None, avoid: list = None) -> str:
+    """Quiz üretimi için istem metnini oluştur"""
+    extra = ""
+    if part:
+        index, total = part
+        extra += f"\nBu istek, quizin {total} bölümünden {index}. bölümüdür; sorular müfredatın özellikle bu bölüme denk gelen kısmına odaklanmalıdır.\n"
+    if avoid:
+        avoided = "\n".join(f"- {text}" for text in avoid)
+        extra += f"\nAşağıdaki sorular zaten var; bunları veya benzerlerini TEKRAR ETMEYİN:\n{avoided}\n"
+    
+    return f"""Lütfen aşağıdaki müfredata göre {num_questions} adet soru oluşturun:
 {curriculum_content}
-
+{extra}
 ÖNEMLİ: Yanıtı SADECE aşağıdaki JSON formatında verin, başka açıklama veya metin EKLEMEDEN:
 
-{
+{{
     "questions": [
-        {
+        {{
             "question": "Soru metni buraya gelecek?",
             "options": [
                 "A) Birinci seçenek",
@@ -73,67 +287,159 @@ def generate_quiz_questions(curriculum_content: str, num_questions: int = 5) ->
                 "C) Üçüncü seçenek",
                 "D) Dördüncü seçenek"
             ],
-            "correct_answer": "A) Birinci seçenek"
-        }
+            "correct_answer": "A) Birinci seçenek",
+            "topic": "Sorunun ilgili olduğu kısa konu başlığı",
+            "difficulty": "orta"
+        }}
     ]
-}
+}}
 
 KURALLAR:
 1. Yanıt SADECE JSON olmalıdır, başka metin veya açıklama OLMAMALIDIR
 2. Her soru için tam olarak 4 seçenek olmalıdır
 3. Seçenekler A), B), C), D) şeklinde başlamalıdır
 4. Doğru cevap mutlaka seçeneklerden biri olmalıdır
-5. Tüm içerik Türkçe olmalıdır"""
-
-        @retry.Retry(predicate=retry.if_exception_type(Exception))
-        def _generate_with_retry():
-            max_attempts = 3
-            for attempt in range(max_attempts):
-                try:
-                    response = current_app.config['GENAI_MODEL'].generate_content(prompt)
-                    if not response or not response.text:
-                        raise AIServiceError("Gemini AI'dan boş yanıt alındı")
-                    
-                    # JSON temizle ve ayrıştır
-                    json_text = clean_json_response(response.text)
-                    data = json.loads(json_text)
-                    
-                    # JSON yapısını doğrula
-                    if not isinstance(data, dict) or "questions" not in data:
-                        raise AIServiceError("Yanıt beklenen JSON yapısında değil")
-                    
-                    questions = data["questions"]
-                    if not isinstance(questions, list) or len(questions) != num_questions:
-                        raise AIServiceError(f"Beklenen soru sayısı ({num_questions}) ile eşleşmiyor")
-                    
-                    # Her soruyu doğrula
-                    for i, q in enumerate(questions):
-                        if not all(key in q for key in ["question", "options", "correct_answer"]):
-                            raise AIServiceError(f"{i+1}. soru gerekli tüm alanları içermiyor")
-                        if not isinstance(q["options"], list) or len(q["options"]) != 4:
-                            raise AIServiceError(f"{i+1}. soru tam olarak 4 seçenek içermiyor")
-                        if not all(opt.startswith(('A)', 'B)', 'C)', 'D)')) for opt in q["options"]):
-                            raise AIServiceError(f"{i+1}. soru için seçenekler A), B), C), D) ile başlamalıdır")
-                        if q["correct_answer"] not in q["options"]:
-                            raise AIServiceError(f"{i+1}. soru için doğru cevap seçenekler arasında değil")
-                    
-                    return questions
-                    
-                except json.JSONDecodeError:
-                    if attempt == max_attempts - 1:
-                        raise AIServiceError("JSON formatında geçerli bir yanıt alınamadı")
-                    current_app.logger.warning(f"JSON ayrıştırma hatası, yeniden deneniyor (Deneme {attempt + 1}/{max_attempts})")
-                    continue
-                    
-                except AIServiceError as e:
-                    if attempt == max_attempts - 1:
-                        raise
-                    current_app.logger.warning(f"AI yanıtı geçersiz, yeniden deneniyor (Deneme {attempt + 1}/{max_attempts}): {str(e)}")
-                    continue
+5. "difficulty" alanı "kolay", "orta" veya "zor" olmalıdır
+6. Tüm içerik Türkçe olmalıdır"""
+
+DIFFICULTY_LEVELS = ('kolay', 'orta', 'zor')
+
+def question_key(text: str) -> str:
+    """Yinelenen soruları yakalamak için soru metnini normalize et"""
+    lowered = text.replace('İ', 'i').replace('I', 'ı').lower()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', lowered).split())
+
+def _parse_questions(response_text: str) -> tuple:
+    """Yanıttaki soruları tek geçişte ayrıştır ve doğrula; (geçerli sorular, hatalar) döndür"""
+    try:
+        data, truncated = extract_json_object(response_text)
+    except JSONExtractionError as e:
+        current_app.logger.debug(f"JSON ayrıştırılamadı ({len(response_text)} karakter, konum {e.position}): {str(e)}")
+        raise InvalidResponseError("JSON formatında geçerli bir yanıt alınamadı")
+    
+    valid, errors = validate_questions(data)
+    if errors and errors[0].index < 0:
+        raise InvalidResponseError("Yanıt beklenen JSON yapısında değil")
+    if truncated:
+        # Kesik yanıttaki tamamlanmış sorular kullanılır; eksikler sonraki turda üretilir
+        current_app.logger.warning(f"Kesik yanıttan {len(valid)} soru kurtarıldı")
+    return valid, errors
+
+# Parçalar, model çağrı sırasını paylaşan ortak bir havuzda çalışır
+_chunk_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ai-quiz-chunk')
+
+def _split_chunks(count: int, chunk_size: int) -> list:
+    chunks = [chunk_size] * (count // chunk_size)
+    if count % chunk_size:
+        chunks.append(count % chunk_size)
+    return chunks
+
+def _generate_question_set(curriculum_content: str, num_questions: int, owner_id, priority,
+                           avoid: list = None) -> list:
+    """Soruları küçük parçalar halinde paralel üret; yalnızca eksik/geçersiz olanları yeniden üret
+
+    Tüm turlar tek bir süre sınırını (AI_QUIZ_TIMEOUT) paylaşır; bu sınır aynı istemi bekleyen
+    çağrıların zaman aşımından (AI_SINGLEFLIGHT_TIMEOUT) uzun olamaz. avoid verilirse bu
+    sorular (ör. soru bankasında zaten olanlar) istemde belirtilir ve tekrar üretilirse
+    kabul edilmez.
+    """
+    app = current_app._get_current_object()
+    chunk_size = int(app.config.get('AI_QUIZ_CHUNK_SIZE') or os.environ.get('AI_QUIZ_CHUNK_SIZE', 5))
+    max_rounds = int(app.config.get('AI_QUIZ_MAX_ROUNDS') or os.environ.get('AI_QUIZ_MAX_ROUNDS', 3))
+    timeout = min(float(app.config.get('AI_QUIZ_TIMEOUT') or os.environ.get('AI_QUIZ_TIMEOUT', 100)),
+                  _singleflight_timeout())
+    deadline = time.monotonic() + timeout
+    
+    existing = list(avoid or [])
+    accepted = []
+    seen = {question_key(text) for text in existing}
+    last_error = None
+    
+    def _run_chunk(prompt, size):
+        with app.app_context():
+            return _call_with_retry(lambda remaining: _parse_questions(_generate_text(
+                prompt, remaining, owner_id, priority, QUESTION_OUTPUT_TOKENS * size)), deadline=deadline)
+    
+    for round_number in range(max_rounds):
+        missing = num_questions - len(accepted)
+        if missing <= 0:
+            break
+        if time.monotonic() >= deadline:
+            last_error = AIServiceError(f"Quiz soruları {timeout:.0f} saniye içinde üretilemedi")
+            break
+        
+        chunks = _split_chunks(missing, chunk_size)
+        avoided = existing + [q["question"] for q in accepted]
+        futures = [
+            _chunk_executor.submit(
+                _run_chunk,
+                build_quiz_prompt(curriculum_content, size,
+                                  part=(index + 1, len(chunks)) if len(chunks) > 1 else None,
+                                  avoid=avoided),
+                size
+            )
+            for index, size in enumerate(chunks)
+        ]
+        
+        for future in futures:
+            try:
+                candidates, errors = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # Kalan parçalar kendi bütçeleri dolunca biter; sonuçları beklenmez
+                future.cancel()
+                last_error = AIServiceError(f"Quiz soruları {timeout:.0f} saniye içinde üretilemedi")
+                current_app.logger.warning(f"Soru parçası süre sınırı içinde tamamlanmadı (Tur {round_number + 1}/{max_rounds})")
+                continue
+            except AIServiceError as e:
+                last_error = e
+                current_app.logger.warning(f"Soru parçası üretilemedi (Tur {round_number + 1}/{max_rounds}): {str(e)}")
+                continue
             
-            raise AIServiceError("Maksimum deneme sayısına ulaşıldı")
+            if errors:
+                current_app.logger.warning(f"{len(errors)} geçersiz soru atlandı: " + "; ".join(str(error) for error in errors))
+            for candidate in candidates:
+                key = question_key(candidate["question"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                difficulty = str(candidate.get("difficulty", "")).strip().lower()
+                accepted.append({
+                    "question": candidate["question"].strip(),
+                    "options": candidate["options"],
+                    "correct_answer": candidate["correct_answer"],
+                    "topic": str(candidate.get("topic") or "").strip()[:200] or None,
+                    "difficulty": difficulty if difficulty in DIFFICULTY_LEVELS else "orta"
+                })
+    
+    if len(accepted) < num_questions:
+        if last_error is not None:
+            raise last_error
+        raise AIServiceError(f"Beklenen soru sayısı ({num_questions}) ile eşleşmiyor")
+    return accepted[:num_questions]
+
+def generate_quiz_questions(curriculum_content: str, num_questions: int = 5, use_cache: bool = True,
+                            owner_id=None, priority=PRIORITY_INTERACTIVE, avoid: list = None) -> list:
+    """Gelişmiş hata yönetimi ve JSON doğrulama ile quiz soruları oluştur
+
+    avoid, üretilmemesi gereken mevcut soru metinleridir; anahtara dahil olduğu için
+    farklı mevcut sorularla yapılan çağrılar aynı yanıtı paylaşmaz.
+    """
+    try:
+        prompt = build_quiz_prompt(curriculum_content, num_questions, avoid=avoid)
+        cache_key = _cache_key(prompt)
+        
+        if use_cache:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
             
-        return _generate_with_retry()
+        def _generate_and_store():
+            questions = _generate_question_set(curriculum_content, num_questions, owner_id, priority, avoid)
+            response_cache.set(cache_key, json.dumps(questions, ensure_ascii=False), model_name=_model_name(_get_model()))
+            return questions
+        
+        # Aynı istem için eşzamanlı çağrılar tek bir Gemini isteğini paylaşır
+        return _coalesce(cache_key, _generate_and_store)
             
     except AIServiceError as e:
         current_app.logger.error(f"Quiz soruları oluşturulurken özel hata: {str(e)}")
@@ -1,16 +1,18 @@
-from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for, send_file
+from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for, send_file, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from models import User, QuizAttempt, Quiz, Curriculum, Student, db
-from sqlalchemy import func, desc, and_, extract, case
-from datetime import datetime, timedelta
-import statistics
-import pandas as pd
+from models import QuizAttempt, Quiz, Curriculum, Student, db
+import analytics_queries
+import cohort
+import item_analysis
+import ranking
+import rollups
+import reports
+import trends
+from datetime import datetime, timezone
+import csv
 import io
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+import os
+from urllib.parse import quote
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -19,241 +21,74 @@ analytics_bp = Blueprint('analytics', __name__)
 def index():
     selected_student_id = request.args.get('student_id', type=int)
     
-    base_query = QuizAttempt.query\
-        .join(Quiz)\
-        .join(Quiz.curriculum)\
-        .join(Student, QuizAttempt.student_id == Student.id)
-    
     if current_user.is_teacher:
+        class_scope = {'teacher_id': current_user.id}
+        class_summary = rollups.summary_for(rollups.SCOPE_TEACHER, current_user.id)
         if selected_student_id:
             student = Student.query.filter_by(
                 id=selected_student_id,
                 teacher_id=current_user.id
             ).first_or_404()
-            
-            attempts = base_query.filter(
-                QuizAttempt.student_id == student.id,
-                Student.teacher_id == current_user.id
-            ).order_by(QuizAttempt.completed_at.desc()).all()
-        else:
-            attempts = base_query.filter(
-                Student.teacher_id == current_user.id
-            ).order_by(QuizAttempt.completed_at.desc()).all()
     else:
         student = Student.query.filter_by(email=current_user.email).first()
         if not student:
             flash('Öğrenci profili bulunamadı.', 'error')
             return redirect(url_for('dashboard.index'))
-            
-        attempts = base_query.filter(
-            QuizAttempt.student_id == student.id
-        ).order_by(QuizAttempt.completed_at.desc()).all()
     
-    total_quizzes = len(attempts)
+    # Genel özet, deneme kaydedilirken güncellenen özet tablolarından okunur
+    if current_user.is_teacher and not selected_student_id:
+        summary = class_summary
+    else:
+        summary = rollups.summary_for(rollups.SCOPE_STUDENT, student.id)
+    total_quizzes = summary['attempts'] if summary else 0
+    
     if total_quizzes > 0:
-        scores = [attempt.score for attempt in attempts if attempt.score is not None]
-        if scores:
-            average_score = statistics.mean(scores)
-            median_score = statistics.median(scores)
-            try:
-                std_dev = statistics.stdev(scores)
-            except statistics.StatisticsError:
-                std_dev = 0
-            highest_score = max(scores)
-            lowest_score = min(scores)
-            
-            if len(scores) >= 2:
-                recent_avg = statistics.mean(scores[:5]) if len(scores) >= 5 else statistics.mean(scores)
-                older_avg = statistics.mean(scores[-5:]) if len(scores) >= 5 else scores[-1]
-                improvement_rate = ((recent_avg - older_avg) / older_avg) * 100
-            else:
-                improvement_rate = 0
-            
-            quartiles = statistics.quantiles(scores)
-        else:
-            average_score = median_score = std_dev = highest_score = lowest_score = improvement_rate = 0
-            quartiles = [0, 0, 0]
-        
-        recent_trend = []
-        trend_scores = []
-        for attempt in sorted(attempts, key=lambda x: x.completed_at, reverse=True)[:10]:
-            try:
-                score = attempt.score
-                trend_scores.append(score)
-                trend_data = {
-                    'date': attempt.completed_at.strftime('%Y-%m-%d'),
-                    'score': score,
-                    'quiz': attempt.quiz.title,
-                    'student': attempt.student_profile.name if attempt.student_profile else 'Unknown',
-                    'curriculum': attempt.quiz.curriculum.title,
-                    'moving_average': statistics.mean(trend_scores) if trend_scores else 0
-                }
-                recent_trend.append(trend_data)
-            except AttributeError:
-                continue
+        average_score = summary['average']
+        median_score = summary['median']
+        std_dev = summary['std_dev']
+        highest_score = summary['highest']
+        lowest_score = summary['lowest']
+        quartiles = summary['quartiles']
     else:
-        average_score = median_score = std_dev = highest_score = lowest_score = improvement_rate = 0
+        average_score = median_score = std_dev = highest_score = lowest_score = 0
         quartiles = [0, 0, 0]
-        recent_trend = []
     
-    curriculum_performance = {}
-    for attempt in attempts:
-        try:
-            curriculum = attempt.quiz.curriculum
-            if curriculum.title not in curriculum_performance:
-                curriculum_performance[curriculum.title] = {
-                    'attempts': 0,
-                    'total_score': 0,
-                    'average': 0,
-                    'student_count': set(),
-                    'scores': [],
-                    'recent_scores': []
-                }
-            
-            if attempt.score is not None:
-                curr_perf = curriculum_performance[curriculum.title]
-                curr_perf['attempts'] += 1
-                curr_perf['total_score'] += attempt.score
-                curr_perf['scores'].append(attempt.score)
-                if attempt.student_id:
-                    curr_perf['student_count'].add(attempt.student_id)
-                curr_perf['recent_scores'].append({
-                    'date': attempt.completed_at.strftime('%Y-%m-%d'),
-                    'score': attempt.score
-                })
-        except AttributeError:
-            continue
-    
-    for curr_title, curr_data in curriculum_performance.items():
-        if curr_data['attempts'] > 0:
-            scores = curr_data['scores']
-            curr_data['average'] = statistics.mean(scores)
-            curr_data['median'] = statistics.median(scores)
-            try:
-                curr_data['std_dev'] = statistics.stdev(scores)
-            except statistics.StatisticsError:
-                curr_data['std_dev'] = 0
-            curr_data['quartiles'] = statistics.quantiles(scores) if len(scores) > 1 else [0, 0, 0]
-            curr_data['student_count'] = len(curr_data['student_count'])
-            curr_data['recent_scores'].sort(key=lambda x: x['date'], reverse=True)
-            curr_data['recent_scores'] = curr_data['recent_scores'][:5]
-            
-            if len(scores) >= 2:
-                recent_avg = statistics.mean(scores[:5]) if len(scores) >= 5 else statistics.mean(scores)
-                older_avg = statistics.mean(scores[-5:]) if len(scores) >= 5 else scores[-1]
-                curr_data['improvement_rate'] = ((recent_avg - older_avg) / older_avg) * 100
-            else:
-                curr_data['improvement_rate'] = 0
+    if not total_quizzes:
+        improvement_rate = 0
+        recent_trend = []
+        curriculum_performance = {}
+    elif current_user.is_teacher and not selected_student_id:
+        # Sınıf metrikleri veritabanında gruplanarak hesaplanır; denemeler belleğe yüklenmez
+        improvement_rate = analytics_queries.progress(class_scope).get(None, {}).get('improvement_rate', 0)
+        recent_trend = analytics_queries.recent_trend(class_scope)
+        curriculum_performance = analytics_queries.curriculum_performance(class_scope)
+    else:
+        # Tek öğrencinin denemeleri küçük olduğundan sütunlu anlık görüntüden hesaplanır
+        view = cohort.snapshot(rollups.SCOPE_STUDENT, student.id)
+        improvement_rate = view.improvement_rate()
+        recent_trend = view.recent_trend()
+        curriculum_performance = view.curriculum_performance()
     
     students = []
     student_performance = {}
+    class_performance = None
+    item_summary = []
     if current_user.is_teacher:
         students = Student.query.filter_by(teacher_id=current_user.id).all()
         
-        for student in students:
-            student_attempts = QuizAttempt.query\
-                .join(Student)\
-                .filter(
-                    QuizAttempt.student_id == student.id,
-                    Student.teacher_id == current_user.id
-                )\
-                .order_by(QuizAttempt.completed_at.desc())\
-                .all()
-            
-            if student_attempts:
-                valid_scores = [a.score for a in student_attempts if a.score is not None]
-                if valid_scores:
-                    avg_score = statistics.mean(valid_scores)
-                    median_score = statistics.median(valid_scores)
-                    try:
-                        std_dev = statistics.stdev(valid_scores)
-                    except statistics.StatisticsError:
-                        std_dev = 0
-                    recent_score = student_attempts[0].score
-                    improvement = recent_score - student_attempts[-1].score if len(valid_scores) > 1 else 0
-                    
-                    week_ago = datetime.utcnow() - timedelta(days=7)
-                    recent_attempts = [a.score for a in student_attempts 
-                                    if a.completed_at >= week_ago and a.score is not None]
-                    weekly_progress = statistics.mean(recent_attempts) if recent_attempts else 0
-                    
-                    class_avg = average_score
-                    performance_percentile = (
-                        len([s for s in scores if s < avg_score]) / len(scores) * 100
-                    ) if scores else 0
-                else:
-                    avg_score = median_score = std_dev = recent_score = improvement = weekly_progress = performance_percentile = 0
-            else:
-                avg_score = median_score = std_dev = recent_score = improvement = weekly_progress = performance_percentile = 0
-            
-            student_performance[student.id] = {
-                'name': student.name,
-                'average_score': avg_score,
-                'median_score': median_score,
-                'std_dev': std_dev,
-                'recent_score': recent_score,
-                'total_attempts': len(student_attempts),
-                'improvement': improvement,
-                'weekly_progress': weekly_progress,
-                'performance_percentile': performance_percentile
-            }
-    
-    class_performance = None
-    if current_user.is_teacher:
-        total_class_attempts = QuizAttempt.query\
-            .join(Student)\
-            .filter(Student.teacher_id == current_user.id)\
-            .count()
+        # Öğrenci tablosu yalnızca sınıf görünümünde gösterilir
+        if not selected_student_id:
+            student_performance = analytics_queries.student_performance(
+                class_scope, students, ranking.rankings(current_user.id, ranking.BY_TEACHER))
+            grade_rankings = ranking.rankings(current_user.id, ranking.BY_GRADE)
+            for student in students:
+                position = grade_rankings[student.grade].position(student.id) \
+                    if student.grade in grade_rankings else None
+                student_performance[student.id]['grade_rank'] = position
         
-        if total_class_attempts > 0:
-            class_scores = db.session.query(QuizAttempt.score)\
-                .join(Student)\
-                .filter(
-                    Student.teacher_id == current_user.id,
-                    QuizAttempt.score.isnot(None)
-                ).all()
-            
-            class_scores = [score[0] for score in class_scores]
-            
-            if class_scores:
-                class_avg = statistics.mean(class_scores)
-                class_median = statistics.median(class_scores)
-                try:
-                    class_std_dev = statistics.stdev(class_scores)
-                except statistics.StatisticsError:
-                    class_std_dev = 0
-                class_quartiles = statistics.quantiles(class_scores)
-            else:
-                class_avg = class_median = class_std_dev = 0
-                class_quartiles = [0, 0, 0]
-            
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            recent_completion = QuizAttempt.query\
-                .join(Student)\
-                .filter(
-                    Student.teacher_id == current_user.id,
-                    QuizAttempt.completed_at >= week_ago
-                ).count()
-            
-            class_performance = {
-                'total_students': len(students),
-                'total_attempts': total_class_attempts,
-                'class_average': class_avg,
-                'class_median': class_median,
-                'class_std_dev': class_std_dev,
-                'class_quartiles': class_quartiles,
-                'recent_completion_rate': (recent_completion / total_class_attempts * 100) if total_class_attempts > 0 else 0
-            }
-        else:
-            class_performance = {
-                'total_students': len(students),
-                'total_attempts': 0,
-                'class_average': 0,
-                'class_median': 0,
-                'class_std_dev': 0,
-                'class_quartiles': [0, 0, 0],
-                'recent_completion_rate': 0
-            }
+        item_summary = item_analysis.teacher_item_summary(current_user.id)
+        
+        class_performance = analytics_queries.class_performance(class_summary, len(students))
     
     return render_template(
         'analytics/index.html',
@@ -270,128 +105,183 @@ def index():
         students=students,
         student_performance=student_performance,
         selected_student_id=selected_student_id,
-        class_performance=class_performance
+        class_performance=class_performance,
+        item_summary=item_summary
     )
 
+TRENDS_PAGE_LIMIT = 500
+TRENDS_MAX_LIMIT = 2000
+
+def _parse_datetime(value):
+    """ISO tarihini ayrıştır; saat dilimi belirtilmişse UTC'ye çevrilip naive değer döner
+
+    Deneme zamanları ve kova sınırları naive UTC olarak tutulur; aware ve naive değerler
+    karşılaştırılamaz.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
 @analytics_bp.route('/analytics/performance_trends')
 @login_required
 def performance_trends():
-    period = request.args.get('period', 'week')
-    student_id = request.args.get('student_id', type=int)
+    """Kova bazlı performans eğilimi
+
+    Parametreler: start/end (ISO tarih), bucket (hour, day, week, month), bir veya daha
+    fazla student_id, cursor/limit (sayfalama). Eski period=week|month|year parametresi
+    de desteklenir.
+    """
+    period = request.args.get('period')
+    bucket = request.args.get('bucket')
+    # Ayrıştırılamayan değerler varsayılana döner; sıfır veya negatif sayfa imleci hiç ilerletmez
+    limit = max(1, min(request.args.get('limit', TRENDS_PAGE_LIMIT, type=int), TRENDS_MAX_LIMIT))
+    student_ids = request.args.getlist('student_id', type=int)
     
-    end_date = datetime.utcnow()
-    if period == 'week':
-        start_date = end_date - timedelta(days=7)
-        date_format = '%Y-%m-%d'
-        date_extract = func.date(QuizAttempt.completed_at)
-    elif period == 'month':
-        start_date = end_date - timedelta(days=30)
-        date_format = '%Y-%m-%d'
-        date_extract = func.date(QuizAttempt.completed_at)
-    else:  # year
-        start_date = end_date - timedelta(days=365)
-        date_format = '%Y-%m'
-        date_extract = func.date_trunc('month', QuizAttempt.completed_at)
+    try:
+        end = _parse_datetime(request.args.get('end')) or datetime.utcnow()
+        start = _parse_datetime(request.args.get('start'))
+        if start is None:
+            delta, default_bucket = trends.PERIODS.get(period or 'week', trends.PERIODS['year'])
+            start = end - delta
+            bucket = bucket or default_bucket
+        cursor = _parse_datetime(request.args.get('cursor'))
+        if cursor is not None:
+            start = max(start, cursor)
+    except ValueError:
+        return jsonify({'error': 'Geçersiz tarih biçimi'}), 400
     
-    base_query = QuizAttempt.query\
-        .join(Quiz)\
-        .join(Quiz.curriculum)\
-        .join(Student, QuizAttempt.student_id == Student.id)\
-        .filter(QuizAttempt.completed_at.between(start_date, end_date))
+    bucket = bucket or 'day'
+    if bucket not in trends.BUCKETS:
+        return jsonify({'error': 'Geçersiz kova boyutu'}), 400
     
     if current_user.is_teacher:
-        if student_id:
-            student = Student.query.filter_by(id=student_id, teacher_id=current_user.id).first_or_404()
-            base_query = base_query.filter(
-                QuizAttempt.student_id == student.id,
+        if student_ids:
+            owned = Student.query.filter(
+                Student.id.in_(student_ids),
                 Student.teacher_id == current_user.id
-            )
-        else:
-            base_query = base_query.filter(Student.teacher_id == current_user.id)
+            ).count()
+            if owned != len(set(student_ids)):
+                return jsonify({'error': 'Öğrenci bulunamadı'}), 404
+        scope = {'teacher_id': current_user.id}
+        scope_key = f"teacher_{current_user.id}"
+        rollup = rollups.get_rollup(rollups.SCOPE_TEACHER, current_user.id)
     else:
         student = Student.query.filter_by(email=current_user.email).first()
-        if student:
-            base_query = base_query.filter(QuizAttempt.student_id == student.id)
-        else:
-            return jsonify({period: []})
+        if not student:
+            return jsonify({period or 'series': []})
+        student_ids = []
+        scope = {'student_id': student.id}
+        scope_key = f"student_{student.id}"
+        rollup = rollups.get_rollup(rollups.SCOPE_STUDENT, student.id)
+    
+    starts = trends.bucket_starts(start, end, bucket, limit=limit + 1)
+    next_cursor = None
+    if len(starts) > limit:
+        next_cursor = starts[limit].isoformat()
+        starts = starts[:limit]
+    range_end = trends.next_bucket(starts[-1], bucket) if starts else end
     
-    attempts_by_date = base_query\
-        .with_entities(
-            date_extract.label('date'),
-            func.avg(QuizAttempt.score).label('avg_score'),
-            func.count(QuizAttempt.id).label('attempt_count')
-        )\
-        .group_by('date')\
-        .order_by('date')\
-        .all()
+    # Son denemenin zamanı değişmediyse yanıt da değişmemiştir
+    tag = trends.etag(scope_key, sorted(student_ids), bucket, starts[0] if starts else start, range_end,
+                      rollup.count if rollup else 0, rollup.last_at if rollup else None)
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+        response.set_etag(tag)
+        return response
     
-    trend_data = []
-    for date, avg_score, attempt_count in attempts_by_date:
-        try:
-            trend_data.append({
-                'date': date.strftime(date_format) if period != 'year' else date.strftime('%Y-%m'),
-                'score': float(avg_score or 0),
-                'attempts': attempt_count
-            })
-        except (AttributeError, ValueError):
-            continue
+    series = trends.bucket_series(scope, scope_key, student_ids, bucket, starts, range_end)
+    data = {
+        'bucket': bucket,
+        'start': starts[0].isoformat() if starts else None,
+        'end': range_end.isoformat(),
+        'series': series,
+        'next_cursor': next_cursor
+    }
+    if period:
+        data[period] = next(iter(series.values()), [])
     
-    return jsonify({period: trend_data})
+    response = jsonify(data)
+    response.set_etag(tag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+CSV_COLUMNS = ['Student', 'Quiz', 'Curriculum', 'Score', 'Date']
+CSV_BATCH_SIZE = 1000
+
+def _attachment_headers(filename):
+    """Türkçe karakter içerebilen dosya adları için Content-Disposition başlığı"""
+    try:
+        filename.encode('ascii')
+        return {'Content-Disposition': f'attachment; filename="{filename}"'}
+    except UnicodeEncodeError:
+        fallback = filename.encode('ascii', 'ignore').decode('ascii') or 'report.csv'
+        return {'Content-Disposition': f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"}
 
 @analytics_bp.route('/analytics/export/csv')
 @login_required
 def export_csv():
     selected_student_id = request.args.get('student_id', type=int)
     
-    base_query = QuizAttempt.query\
-        .join(Quiz)\
-        .join(Quiz.curriculum)\
+    # Yalnızca gerekli sütunlar tek bir JOIN sorgusuyla okunur; ORM nesnesi oluşturulmaz
+    rows = db.session.query(
+        Student.name,
+        Quiz.title,
+        Curriculum.title,
+        QuizAttempt.score,
+        QuizAttempt.completed_at
+    ).select_from(QuizAttempt)\
+        .join(Quiz, QuizAttempt.quiz_id == Quiz.id)\
+        .join(Curriculum, Quiz.curriculum_id == Curriculum.id)\
         .join(Student, QuizAttempt.student_id == Student.id)
     
     if current_user.is_teacher:
         if selected_student_id:
             student = Student.query.filter_by(id=selected_student_id, teacher_id=current_user.id).first_or_404()
-            attempts = base_query.filter(
+            rows = rows.filter(
                 QuizAttempt.student_id == student.id,
                 Student.teacher_id == current_user.id
-            ).order_by(QuizAttempt.completed_at.desc()).all()
+            )
             filename = f"performance_report_{student.name}_{datetime.now().strftime('%Y%m%d')}.csv"
         else:
-            attempts = base_query.filter(
-                Student.teacher_id == current_user.id
-            ).order_by(QuizAttempt.completed_at.desc()).all()
+            rows = rows.filter(Student.teacher_id == current_user.id)
             filename = f"class_performance_report_{datetime.now().strftime('%Y%m%d')}.csv"
     else:
         student = Student.query.filter_by(email=current_user.email).first()
         if not student:
             flash('Öğrenci profili bulunamadı.', 'error')
             return redirect(url_for('dashboard.index'))
-            
-        attempts = base_query.filter(
-            QuizAttempt.student_id == student.id
-        ).order_by(QuizAttempt.completed_at.desc()).all()
+        
+        rows = rows.filter(QuizAttempt.student_id == student.id)
         filename = f"my_performance_report_{datetime.now().strftime('%Y%m%d')}.csv"
     
-    data = []
-    for attempt in attempts:
-        data.append({
-            'Student': attempt.student_profile.name,
-            'Quiz': attempt.quiz.title,
-            'Curriculum': attempt.quiz.curriculum.title,
-            'Score': f"{attempt.score:.1f}%",
-            'Date': attempt.completed_at.strftime('%Y-%m-%d %H:%M'),
-        })
+    # yield_per, PostgreSQL'de sunucu taraflı imleçle satırları parça parça getirir
+    rows = rows.order_by(QuizAttempt.completed_at.desc()).yield_per(CSV_BATCH_SIZE)
     
-    df = pd.DataFrame(data)
-    output = io.StringIO()
-    df.to_csv(output, index=False, encoding='utf-8')
-    output.seek(0)
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for index, (student_name, quiz_title, curriculum_title, score, completed_at) in enumerate(rows, 1):
+            writer.writerow([
+                student_name,
+                quiz_title,
+                curriculum_title,
+                f"{score:.1f}%" if score is not None else '',
+                completed_at.strftime('%Y-%m-%d %H:%M') if completed_at else ''
+            ])
+            if index % CSV_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
     
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv; charset=utf-8',
+        headers=_attachment_headers(filename)
     )
 
 @analytics_bp.route('/analytics/export/pdf')
@@ -399,142 +289,61 @@ def export_csv():
 def export_pdf():
     selected_student_id = request.args.get('student_id', type=int)
     
-    try:
-        # Create PDF buffer
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-        
-        # Custom style for Turkish characters
-        custom_style = ParagraphStyle(
-            'CustomStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            leading=16
-        )
-        
-        # Add title
-        if current_user.is_teacher and selected_student_id:
+    if current_user.is_teacher:
+        if selected_student_id:
             student = Student.query.filter_by(id=selected_student_id, teacher_id=current_user.id).first_or_404()
             title = f"Performans Raporu - {student.name}"
         else:
-            title = "Sınıf Performans Raporu" if current_user.is_teacher else "Performans Raporum"
-        
-        elements.append(Paragraph(title, styles['Title']))
-        elements.append(Spacer(1, 20))
-        
-        # Query attempts
-        base_query = QuizAttempt.query\
-            .join(Quiz)\
-            .join(Quiz.curriculum)\
-            .join(Student, QuizAttempt.student_id == Student.id)
-        
-        if current_user.is_teacher:
-            if selected_student_id:
-                attempts = base_query.filter(
-                    QuizAttempt.student_id == selected_student_id,
-                    Student.teacher_id == current_user.id
-                ).order_by(QuizAttempt.completed_at.desc()).all()
-            else:
-                attempts = base_query.filter(
-                    Student.teacher_id == current_user.id
-                ).order_by(QuizAttempt.completed_at.desc()).all()
-        else:
-            student = Student.query.filter_by(email=current_user.email).first()
-            if not student:
-                flash('Öğrenci profili bulunamadı.', 'error')
-                return redirect(url_for('dashboard.index'))
-                
-            attempts = base_query.filter(
-                QuizAttempt.student_id == student.id
-            ).order_by(QuizAttempt.completed_at.desc()).all()
-        
-        # Calculate statistics
-        if attempts:
-            scores = [attempt.score for attempt in attempts]
-            avg_score = statistics.mean(scores)
-            median_score = statistics.median(scores)
-            try:
-                std_dev = statistics.stdev(scores)
-            except statistics.StatisticsError:
-                std_dev = 0
-            
-            # Add statistics table
-            stats_data = [
-                ['İstatistik', 'Değer'],
-                ['Ortalama Puan', f'{avg_score:.1f}%'],
-                ['Medyan Puan', f'{median_score:.1f}%'],
-                ['Standart Sapma', f'{std_dev:.1f}'],
-                ['Quiz Sayısı', str(len(attempts))]
-            ]
-            
-            stats_table = Table(stats_data, colWidths=[200, 200])
-            stats_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(stats_table)
-            elements.append(Spacer(1, 20))
-            
-            # Add attempts table
-            attempts_data = [['Öğrenci', 'Quiz', 'Müfredat', 'Puan', 'Tarih']]
-            for attempt in attempts:
-                attempts_data.append([
-                    attempt.student_profile.name,
-                    attempt.quiz.title,
-                    attempt.quiz.curriculum.title,
-                    f"{attempt.score:.1f}%",
-                    attempt.completed_at.strftime('%Y-%m-%d %H:%M')
-                ])
-            
-            attempts_table = Table(attempts_data, colWidths=[100, 100, 100, 70, 100])
-            attempts_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 10),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(attempts_table)
-        else:
-            elements.append(Paragraph("Henüz quiz denemesi bulunmuyor.", custom_style))
-        
-        # Generate PDF
-        doc.build(elements)
-        buffer.seek(0)
-        
-        # Generate filename
-        if current_user.is_teacher and selected_student_id:
-            filename = f"performance_report_{student.name}_{datetime.now().strftime('%Y%m%d')}.pdf"
-        else:
-            filename = f"{'class' if current_user.is_teacher else 'my'}_performance_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-        
-        return send_file(
-            buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+            student = None
+            title = "Sınıf Performans Raporu"
+    else:
+        student = Student.query.filter_by(email=current_user.email).first()
+        if not student:
+            flash('Öğrenci profili bulunamadı.', 'error')
+            return redirect(url_for('dashboard.index'))
+        title = "Performans Raporum"
+    
+    student_id = student.id if student else None
+    try:
+        # Veri değişmediyse önceden oluşturulmuş rapor doğrudan gönderilir
+        path = reports.cached_report(current_user.id, student_id)
+        if path:
+            return send_file(
+                path,
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=_report_filename(student)
+            )
         
+        job = reports.request_report(current_user.id, student_id, title)
     except Exception as e:
         current_app.logger.error(f"PDF export error: {str(e)}")
         flash('PDF raporu oluşturulurken bir hata oluştu.', 'error')
-        return redirect(url_for('analytics.index'))
\ No newline at end of file
+        return redirect(url_for('analytics.index'))
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'job_id': job.id, 'status_url': url_for('jobs.status', job_id=job.id)}), 202
+    flash('Rapor hazırlanıyor. Hazır olduğunda indirme bağlantısı bildirim olarak gelecek.', 'info')
+    return redirect(url_for('analytics.index', student_id=selected_student_id))
+
+def _report_filename(student):
+    if current_user.is_teacher and student:
+        return f"performance_report_{student.name}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    return f"{'class' if current_user.is_teacher else 'my'}_performance_report_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+@analytics_bp.route('/analytics/reports/<name>')
+@login_required
+def download_report(name):
+    owner_id, student_id = reports.artifact_owner(name)
+    path = reports.artifact_path(name)
+    if owner_id != current_user.id or path is None or not os.path.exists(path):
+        flash('Rapor bulunamadı veya güncelliğini yitirdi; lütfen yeniden oluşturun.', 'error')
+        return redirect(url_for('analytics.index'))
+    
+    student = db.session.get(Student, student_id) if student_id is not None else None
+    return send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=_report_filename(student)
+    )
@@ -0,0 +1,286 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from models import db, QuizAttempt, Quiz, Curriculum, Student
+from score_stats import ScoreStats
+
+QUARTILES = (0.25, 0.5, 0.75)
+TREND_WINDOW = 5
+
+def attempts_query(*columns, teacher_id=None, student_id=None):
+    """Analize dahil edilen denemeler: bir öğretmenin sınıfı ve/veya tek bir öğrenci"""
+    query = db.session.query(*columns).select_from(QuizAttempt)\
+        .join(Quiz, QuizAttempt.quiz_id == Quiz.id)\
+        .join(Curriculum, Quiz.curriculum_id == Curriculum.id)\
+        .join(Student, QuizAttempt.student_id == Student.id)
+    if teacher_id is not None:
+        query = query.filter(Student.teacher_id == teacher_id)
+    if student_id is not None:
+        query = query.filter(QuizAttempt.student_id == student_id)
+    return query
+
+def supports_percentile():
+    """Veritabanı stddev_samp ve percentile_cont destekliyor mu (PostgreSQL)"""
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+def score_histograms(scope, group_column=None):
+    """Tam puana yuvarlanmış puan histogramlarını GROUP BY ile getir; grup verilmezse anahtar None olur
+
+    Satır sayısı deneme sayısına değil, grup başına farklı puan sayısına (en fazla 101) bağlıdır.
+    """
+    bucket = func.round(QuizAttempt.score)
+    columns = [bucket, func.count(QuizAttempt.id)]
+    if group_column is not None:
+        columns.insert(0, group_column)
+    query = attempts_query(*columns, **scope).filter(QuizAttempt.score.isnot(None))
+    if group_column is not None:
+        query = query.group_by(group_column, bucket)
+    else:
+        query = query.group_by(bucket)
+
+    histograms = {}
+    for row in query.all():
+        key = row[0] if group_column is not None else None
+        histograms.setdefault(key, {})[row[-2]] = row[-1]
+    return histograms
+
+def summarize(scope, group_column=None):
+    """Ortalama, sapma, çeyrekler, en yüksek/düşük ve son hafta verilerini veritabanında hesapla
+
+    scope, attempts_query filtreleridir (teacher_id ve/veya student_id). PostgreSQL'de
+    stddev_samp ve percentile_cont kullanılır; SQLite gibi bu fonksiyonları desteklemeyen
+    veritabanlarında sapma kareler toplamından, çeyrekler gruplanmış puan histogramından
+    ScoreStats ile hesaplanır.
+    """
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    score = QuizAttempt.score
+    postgres = supports_percentile()
+
+    columns = [
+        func.count(QuizAttempt.id).label('attempts'),
+        func.count(score).label('scored'),
+        func.sum(score).label('total'),
+        func.sum(score * score).label('sum_squares'),
+        func.avg(score).label('average'),
+        func.min(score).label('lowest'),
+        func.max(score).label('highest'),
+        func.count(func.distinct(case((score.isnot(None), QuizAttempt.student_id)))).label('students'),
+        func.count(case((QuizAttempt.completed_at >= week_ago, QuizAttempt.id))).label('recent_attempts'),
+        func.avg(case((QuizAttempt.completed_at >= week_ago, score))).label('recent_average'),
+    ]
+    if postgres:
+        columns.append(func.stddev_samp(score).label('std_dev'))
+        columns += [func.percentile_cont(q).within_group(score).label(f'q{i}') for i, q in enumerate(QUARTILES)]
+    if group_column is not None:
+        columns.insert(0, group_column.label('group_key'))
+
+    query = attempts_query(*columns, **scope)
+    if group_column is not None:
+        query = query.group_by(group_column)
+    rows = query.all()
+
+    histograms = {} if postgres else score_histograms(scope, group_column)
+
+    summaries = {}
+    for row in rows:
+        key = row.group_key if group_column is not None else None
+        scored = row.scored or 0
+        if postgres:
+            std_dev = row.std_dev or 0
+            quartiles = [row.q0 or 0, row.q1 or 0, row.q2 or 0]
+        else:
+            stats = ScoreStats.from_moments(scored, float(row.total or 0), float(row.sum_squares or 0),
+                                            histogram=histograms.get(key))
+            std_dev = stats.std_dev
+            quartiles = stats.quantiles(QUARTILES)
+
+        summaries[key] = {
+            'attempts': row.attempts,
+            'scored': scored,
+            'total_score': float(row.total or 0),
+            'average': float(row.average or 0),
+            'median': float(quartiles[1]),
+            'std_dev': float(std_dev),
+            'quartiles': [float(q) for q in quartiles],
+            'highest': float(row.highest or 0),
+            'lowest': float(row.lowest or 0),
+            'student_count': row.students,
+            'recent_attempts': row.recent_attempts,
+            'recent_average': float(row.recent_average or 0),
+        }
+    return summaries
+
+def _ranked_attempts(scope, group_column=None):
+    """Puanlı denemeleri her grupta yeniden eskiye ve eskiden yeniye numaralandır"""
+    partition = [group_column] if group_column is not None else None
+    columns = [
+        QuizAttempt.score.label('score'),
+        QuizAttempt.completed_at.label('completed_at'),
+        func.row_number().over(
+            partition_by=partition,
+            order_by=(QuizAttempt.completed_at.desc(), QuizAttempt.id.desc())
+        ).label('newest_rank'),
+        func.row_number().over(
+            partition_by=partition,
+            order_by=(QuizAttempt.completed_at.asc(), QuizAttempt.id.asc())
+        ).label('oldest_rank'),
+        func.count(QuizAttempt.id).over(partition_by=partition).label('scored'),
+    ]
+    if group_column is not None:
+        columns.insert(0, group_column.label('group_key'))
+    return attempts_query(*columns, **scope).filter(QuizAttempt.score.isnot(None)).subquery()
+
+def progress(scope, group_column=None):
+    """Son ve ilk denemelere göre gelişimi pencere fonksiyonlarıyla hesapla
+
+    Gelişim oranı, en yeni 5 denemenin ortalamasının en eski 5 denemenin ortalamasına
+    göre yüzde değişimidir; 5'ten az deneme varsa tüm denemelerin ortalaması en eski
+    denemeyle karşılaştırılır.
+    """
+    ranked = _ranked_attempts(scope, group_column)
+    older_limit = case((ranked.c.scored >= TREND_WINDOW, TREND_WINDOW), else_=1)
+    columns = [
+        func.max(ranked.c.scored).label('scored'),
+        func.avg(case((ranked.c.newest_rank <= TREND_WINDOW, ranked.c.score))).label('recent_average'),
+        func.avg(case((ranked.c.oldest_rank <= older_limit, ranked.c.score))).label('older_average'),
+        func.max(case((ranked.c.newest_rank == 1, ranked.c.score))).label('latest'),
+        func.max(case((ranked.c.oldest_rank == 1, ranked.c.score))).label('oldest'),
+    ]
+    if group_column is not None:
+        columns.insert(0, ranked.c.group_key)
+    query = db.session.query(*columns)
+    if group_column is not None:
+        query = query.group_by(ranked.c.group_key)
+
+    results = {}
+    for row in query.all():
+        if not row.scored:
+            continue
+        key = row.group_key if group_column is not None else None
+        improvement_rate = 0
+        if row.scored >= 2 and row.older_average:
+            improvement_rate = (row.recent_average - row.older_average) / row.older_average * 100
+        results[key] = {
+            'improvement_rate': float(improvement_rate),
+            'latest': float(row.latest or 0),
+            'improvement': float(row.latest - row.oldest) if row.scored > 1 else 0,
+        }
+    return results
+
+def recent_scores(scope, group_column, limit=TREND_WINDOW):
+    """Her grubun en yeni puanlarını pencere fonksiyonuyla getir"""
+    ranked = _ranked_attempts(scope, group_column)
+    rows = db.session.query(ranked.c.group_key, ranked.c.score, ranked.c.completed_at)\
+        .filter(ranked.c.newest_rank <= limit)\
+        .order_by(ranked.c.group_key, ranked.c.newest_rank)\
+        .all()
+
+    results = {}
+    for key, score, completed_at in rows:
+        results.setdefault(key, []).append({
+            'date': completed_at.strftime('%Y-%m-%d'),
+            'score': score
+        })
+    return results
+
+def recent_trend(scope, limit=10):
+    """En yeni denemeler ve yeniden eskiye kümülatif hareketli ortalama"""
+    order = (QuizAttempt.completed_at.desc(), QuizAttempt.id.desc())
+    rows = attempts_query(
+        QuizAttempt.completed_at,
+        QuizAttempt.score,
+        Quiz.title.label('quiz_title'),
+        Student.name.label('student_name'),
+        Curriculum.title.label('curriculum_title'),
+        func.avg(QuizAttempt.score).over(order_by=order, rows=(None, 0)).label('moving_average'),
+        **scope
+    ).filter(QuizAttempt.score.isnot(None)).order_by(*order).limit(limit).all()
+
+    return [{
+        'date': row.completed_at.strftime('%Y-%m-%d'),
+        'score': row.score,
+        'quiz': row.quiz_title,
+        'student': row.student_name or 'Unknown',
+        'curriculum': row.curriculum_title,
+        'moving_average': float(row.moving_average or 0)
+    } for row in rows]
+
+def curriculum_performance(scope):
+    """Müfredat başlığına göre gruplanmış performans özeti"""
+    summaries = summarize(scope, Curriculum.title)
+    progress_by_title = progress(scope, Curriculum.title)
+    recent_by_title = recent_scores(scope, Curriculum.title)
+
+    performance = {}
+    for title, summary in summaries.items():
+        if not summary['scored']:
+            continue
+        performance[title] = {
+            'attempts': summary['scored'],
+            'total_score': summary['total_score'],
+            'average': summary['average'],
+            'median': summary['median'],
+            'std_dev': summary['std_dev'],
+            'quartiles': summary['quartiles'] if summary['scored'] > 1 else [0, 0, 0],
+            'student_count': summary['student_count'],
+            'recent_scores': recent_by_title.get(title, []),
+            'improvement_rate': progress_by_title.get(title, {}).get('improvement_rate', 0)
+        }
+    return performance
+
+def student_performance(scope, students, ranking):
+    """Öğrenci başına istatistikler GROUP BY öğrenci ile; yüzdelik dilim verilen sıralamadan (ranking.Ranking) gelir"""
+    summaries = summarize(scope, QuizAttempt.student_id)
+    progress_by_student = progress(scope, QuizAttempt.student_id)
+    percentiles = ranking.percentiles()
+
+    performance = {}
+    for student in students:
+        summary = summaries.get(student.id)
+        if summary and summary['scored']:
+            student_progress = progress_by_student.get(student.id, {})
+            performance[student.id] = {
+                'name': student.name,
+                'average_score': summary['average'],
+                'median_score': summary['median'],
+                'std_dev': summary['std_dev'],
+                'recent_score': student_progress.get('latest', 0),
+                'total_attempts': summary['scored'],
+                'improvement': student_progress.get('improvement', 0),
+                'weekly_progress': summary['recent_average'],
+                'performance_percentile': percentiles.get(student.id, 0)
+            }
+        else:
+            performance[student.id] = {
+                'name': student.name,
+                'average_score': 0,
+                'median_score': 0,
+                'std_dev': 0,
+                'recent_score': 0,
+                'total_attempts': 0,
+                'improvement': 0,
+                'weekly_progress': 0,
+                'performance_percentile': 0
+            }
+    return performance
+
+def class_performance(summary, total_students):
+    """Sınıf özeti; summary, öğretmenin özet tablosundan rollups.summary_for() sonucudur"""
+    if not summary or not summary['attempts']:
+        return {
+            'total_students': total_students,
+            'total_attempts': 0,
+            'class_average': 0,
+            'class_median': 0,
+            'class_std_dev': 0,
+            'class_quartiles': [0, 0, 0],
+            'recent_completion_rate': 0
+        }
+    return {
+        'total_students': total_students,
+        'total_attempts': summary['attempts'],
+        'class_average': summary['average'],
+        'class_median': summary['median'],
+        'class_std_dev': summary['std_dev'],
+        'class_quartiles': summary['quartiles'],
+        'recent_completion_rate': summary['recent_attempts'] / summary['attempts'] * 100
+    }
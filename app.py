@@ -3,7 +3,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
-import google.generativeai as genai
+from ai_backends import create_backend
 import notifications
 
 class Base(DeclarativeBase):
@@ -28,9 +28,8 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
-# Gemini AI yapılandırması
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-app.config['GENAI_MODEL'] = genai.GenerativeModel('gemini-pro')
+# Gemini AI yapılandırması (AI_BACKEND=fake ile çevrimdışı sahte model kullanılır)
+app.config['GENAI_MODEL'] = create_backend(app.config)
 
 # Eklentileri başlat
 db.init_app(app)
@@ -49,6 +48,12 @@ with app.app_context():
     from google_auth import google_auth
     from analytics import analytics_bp
     from student import student_bp
+    from jobs import jobs_bp, init_app as init_jobs
+    from ai_cache import init_app as init_ai_cache
+    from ai_service import init_app as init_ai_service
+    from query_counter import init_app as init_query_counter
+    from rollups import init_app as init_rollups
+    from item_analysis import init_app as init_item_analysis
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(curriculum_bp)
@@ -56,11 +61,22 @@ with app.app_context():
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(analytics_bp)
     app.register_blueprint(student_bp)
+    app.register_blueprint(jobs_bp)
     app.register_blueprint(google_auth, url_prefix='/')
     
     # Modelleri içe aktar ve tablolar yoksa oluştur
     import models
     db.create_all()
+    
+    # İstek başına SQL sorgu sayısını izle
+    init_query_counter(app, db)
+    init_rollups(app)
+    init_item_analysis(app)
+    
+    # AI servisini, yanıt önbelleğini ve arka plan üretim kuyruğunu başlat
+    init_ai_service(app)
+    init_ai_cache(app)
+    init_jobs(app)
 
 @login_manager.user_loader
 def load_user(user_id):
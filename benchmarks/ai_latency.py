@@ -0,0 +1,120 @@
+"""Sahte Gemini modeli üzerinde AI üretim yollarının gecikme ve verim ölçümü
+
+Örnek:
+    python benchmarks/ai_latency.py --target quiz --requests 200 --concurrency 20 \
+        --latency "lognormal:median=1.2,sigma=0.6" --scenarios "valid=0.85,malformed_json=0.1,unavailable=0.05"
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _configure_environment(args):
+    # Uygulama içe aktarılmadan önce sahte arka ucu ve geçici veritabanını seç
+    os.environ['AI_BACKEND'] = 'fake'
+    os.environ['AI_CACHE_ENABLED'] = '0'
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ['AI_FAKE_LATENCY'] = args.latency
+    if args.scenarios:
+        os.environ['AI_FAKE_SCENARIOS'] = args.scenarios
+    if args.seed is not None:
+        os.environ['AI_FAKE_SEED'] = str(args.seed)
+    os.environ.setdefault('AI_RATE_LIMIT_RPM', str(args.rpm))
+    os.environ.setdefault('AI_MAX_CONCURRENCY', str(args.concurrency))
+    os.environ.setdefault('AI_RETRY_INITIAL_DELAY', str(args.retry_delay))
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+CURRICULUM_SAMPLE = """# Fotosentez
+
+## Öğrenme Hedefleri
+- Fotosentezin tanımını yapabilme
+- Işık ve karanlık evreleri ayırt edebilme
+
+## Ana Kavramlar
+- Klorofil, ATP, NADPH, Calvin döngüsü
+"""
+
+def run_target(app, target, args):
+    import ai_service
+
+    model = app.config['GENAI_MODEL']
+    model.reset_counters()
+    ai_service.retry_engine.metrics.reset()
+
+    def _one(index):
+        # Her istek benzersiz olsun ki tekil uçuş birleştirmesi ölçümü bozmasın
+        suffix = uuid.uuid4().hex[:6]
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                if target == 'quiz':
+                    ai_service.generate_quiz_questions(
+                        f"{CURRICULUM_SAMPLE}\n<!-- {suffix} -->", args.questions,
+                        use_cache=False, owner_id=index % args.teachers)
+                else:
+                    ai_service.generate_curriculum_content(
+                        f"Fotosentez {suffix}", 'intermediate',
+                        use_cache=False, owner_id=index % args.teachers)
+                return time.perf_counter() - started, None
+            except ai_service.AIServiceError as e:
+                return time.perf_counter() - started, e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(_one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, error in results if error is None]
+    failures = [error for _, error in results if error is not None]
+    metrics = ai_service.retry_engine.metrics.snapshot()
+    parse_failures = sum(count for name, count in metrics['errors'].items() if name == 'InvalidResponseError')
+
+    print(f"\n== {target} ({args.requests} istek, eşzamanlılık {args.concurrency}) ==")
+    print(f"verim              : {len(results) / elapsed:.2f} istek/sn")
+    print(f"başarılı / hatalı  : {len(latencies)} / {len(failures)}")
+    if latencies:
+        print(f"gecikme ort        : {statistics.mean(latencies):.3f} sn")
+        print(f"gecikme p50/p95/p99: {_percentile(latencies, 50):.3f} / "
+              f"{_percentile(latencies, 95):.3f} / {_percentile(latencies, 99):.3f} sn")
+    print(f"model çağrısı      : {metrics['attempts']} (çağrı başına {metrics['avg_attempts']:.2f} deneme)")
+    print(f"deneme dağılımı    : {dict(sorted(metrics['attempts_per_call'].items()))}")
+    print(f"ayrıştırma hatası  : {parse_failures} ({parse_failures / metrics['attempts'] * 100 if metrics['attempts'] else 0:.1f}% deneme)")
+    print(f"hata türleri       : {metrics['errors']}")
+    print(f"sahte senaryolar   : {model.counters}")
+    print(f"hız sınırlayıcı    : {ai_service.rate_limiter.stats()['lanes']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['quiz', 'curriculum', 'both'], default='both')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--teachers', type=int, default=5)
+    parser.add_argument('--latency', default='lognormal:median=0.8,sigma=0.5')
+    parser.add_argument('--scenarios', default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rpm', type=int, default=100000)
+    parser.add_argument('--retry-delay', type=float, default=0.2)
+    args = parser.parse_args()
+
+    _configure_environment(args)
+    from app import app
+
+    targets = ['quiz', 'curriculum'] if args.target == 'both' else [args.target]
+    for target in targets:
+        run_target(app, target, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""AI yanıtlarından JSON çıkarma: eski iki düzenli ifadeli yöntem ile tek geçişli çıkarıcının karşılaştırması
+
+Örnek:
+    python benchmarks/json_extraction.py --questions 50 --repeat 2000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_json import extract_json_object, validate_questions, JSONExtractionError
+from ai_backends import FakeModelBackend
+
+def legacy_clean_json_response(response_text):
+    """ai_service.clean_json_response'un önceki hali (loglama hariç)"""
+    text = re.sub(r'```(?:json)?\n?(.*?)\n```', r'\1', response_text, flags=re.DOTALL)
+    match = re.search(r'({[\s\S]*})', text)
+    if match:
+        text = match.group(1)
+    return text.strip()
+
+def legacy_parse(response_text):
+    data = json.loads(legacy_clean_json_response(response_text))
+    valid = []
+    for q in data["questions"]:
+        if not all(key in q for key in ["question", "options", "correct_answer"]):
+            continue
+        if len(q["options"]) != 4:
+            continue
+        if not all(opt.startswith(('A)', 'B)', 'C)', 'D)')) for opt in q["options"]):
+            continue
+        if q["correct_answer"] not in q["options"]:
+            continue
+        valid.append(q)
+    return valid
+
+def new_parse(response_text):
+    data, _ = extract_json_object(response_text)
+    return validate_questions(data)[0]
+
+def build_samples(num_questions):
+    backend = FakeModelBackend(seed=1)
+    prompt = f"Lütfen aşağıdaki müfredata göre {num_questions} adet soru oluşturun:"
+    valid = backend._render(prompt, 'valid', 0.5)
+    return {
+        'valid': valid,
+        'fenced': backend._render(prompt, 'fenced', 0.5),
+        'truncated': valid[:int(len(valid) * 0.7)],
+        'large': backend._render(prompt.replace(str(num_questions), str(num_questions * 10)), 'valid', 0.5),
+    }
+
+def _outcome(parse, text):
+    try:
+        return f"{len(parse(text))} soru"
+    except (ValueError, KeyError, JSONExtractionError) as e:
+        return f"hata ({type(e).__name__})"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'örnek':<10} {'boyut':>8}  {'eski (µs)':>10} {'yeni (µs)':>10}  eski sonuç / yeni sonuç")
+    for name, text in build_samples(args.questions).items():
+        timings = []
+        for parse in (legacy_parse, new_parse):
+            def _run(parse=parse):
+                try:
+                    parse(text)
+                except (ValueError, KeyError):
+                    pass
+            timings.append(min(timeit.repeat(_run, number=args.repeat, repeat=3)) / args.repeat * 1e6)
+        print(f"{name:<10} {len(text):>8}  {timings[0]:>10.1f} {timings[1]:>10.1f}  "
+              f"{_outcome(legacy_parse, text)} / {_outcome(new_parse, text)}")
+
+if __name__ == '__main__':
+    main()
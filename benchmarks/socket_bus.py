@@ -0,0 +1,93 @@
+"""Yerel Socket.IO yayın yöneticisinin (local://) işçi sayısına göre verim ve gecikme ölçümü
+
+Yayıncı, LocalSocketManager ile Socket.IO emit mesajlarıyla aynı biçimdeki mesajları
+yayınlar; her işçi süreci kendi soketinden mesajları alıp teslim gecikmesini ölçer.
+
+Örnek:
+    python benchmarks/socket_bus.py --workers 1,2,4,8 --messages 5000 --payload 512
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socket_bus import LocalSocketBus, LocalSocketManager
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def _worker(directory, channel, ready, results):
+    bus = LocalSocketBus(directory, channel).open()
+    ready.put(os.getpid())
+    latencies = []
+    try:
+        for message in bus.receive():
+            data = pickle.loads(message)
+            if data['event'] == 'stop':
+                break
+            latencies.append(time.monotonic() - data['data']['sent_at'])
+    finally:
+        bus.close()
+    results.put(latencies)
+
+def run(workers, args):
+    directory = tempfile.mkdtemp(prefix='socket-bus-')
+    channel = f"bench{workers}"
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(directory, channel, ready, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+
+    manager = LocalSocketManager(f"local://{directory}", channel=channel, write_only=True)
+    padding = 'x' * args.payload
+
+    def message(event, data):
+        return {'method': 'emit', 'event': event, 'data': data, 'namespace': '/',
+                'room': 'teacher_1', 'skip_sid': None, 'callback': None, 'host_id': manager.host_id}
+
+    started = time.perf_counter()
+    for index in range(args.messages):
+        manager._publish(message('notification_batch', {'batch': index, 'sent_at': time.monotonic(), 'padding': padding}))
+    elapsed = time.perf_counter() - started
+    manager._publish(message('stop', {}))
+
+    latencies = []
+    for _ in processes:
+        latencies += results.get()
+    for process in processes:
+        process.join()
+
+    expected = args.messages * workers
+    print(f"\n== {workers} işçi ({args.messages} mesaj, {args.payload} bayt) ==")
+    print(f"yayın verimi       : {args.messages / elapsed:.0f} mesaj/sn")
+    print(f"teslim verimi      : {len(latencies) / elapsed:.0f} mesaj/sn")
+    print(f"teslim edilen      : {len(latencies)} / {expected} ({expected - len(latencies)} kayıp)")
+    if latencies:
+        print(f"gecikme p50/p95/p99: {_percentile(latencies, 50) * 1000:.3f} / "
+              f"{_percentile(latencies, 95) * 1000:.3f} / {_percentile(latencies, 99) * 1000:.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4,8', help='Virgülle ayrılmış işçi sayıları')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--payload', type=int, default=512, help='Mesaj başına ek veri (bayt)')
+    args = parser.parse_args()
+
+    for workers in [int(count) for count in args.workers.split(',')]:
+        run(workers, args)
+
+if __name__ == '__main__':
+    main()
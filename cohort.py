@@ -0,0 +1,217 @@
+import os
+import time
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from flask import current_app
+from ai_cache import MemoryCache
+from models import db, QuizAttempt, Quiz, Curriculum, Student
+from analytics_queries import attempts_query, QUARTILES, TREND_WINDOW
+import rollups
+
+# Sütunlu anlık görüntünün tipleri: kimlikler int32, puanlar float32, zamanlar datetime64
+DTYPES = {
+    'attempt_id': 'int32',
+    'student_id': 'int32',
+    'quiz_id': 'int32',
+    'curriculum_id': 'int32',
+    'score': 'float32',
+    'completed_at': 'datetime64[ns]',
+}
+# Artımlı yüklemede son denemeden bu kadar öncesi yeniden okunur; geç commit edilen
+# eşzamanlı denemeler böylece kaçırılmaz (zaten yüklenmiş olanlar kimlikten elenir)
+RELOAD_OVERLAP = timedelta(minutes=10)
+
+_snapshots = None
+
+def _cache():
+    global _snapshots
+    if _snapshots is None:
+        _snapshots = MemoryCache(
+            max_entries=int(current_app.config.get('COHORT_CACHE_SIZE') or os.environ.get('COHORT_CACHE_SIZE', 32)),
+            ttl=int(current_app.config.get('COHORT_CACHE_TTL') or os.environ.get('COHORT_CACHE_TTL', 3600))
+        )
+    return _snapshots
+
+def _names(id_column, name_column, ids):
+    """Çerçevede geçen kimliklerin adlarını tek sorguda getir"""
+    unique_ids = ids.unique().tolist()
+    if not unique_ids:
+        return pd.Series(dtype=object)
+    rows = db.session.query(id_column, name_column).filter(id_column.in_(unique_ids)).all()
+    return pd.Series(dict(rows), dtype=object)
+
+def _attempt_frame(filters, since=None):
+    query = attempts_query(
+        QuizAttempt.id,
+        QuizAttempt.student_id,
+        QuizAttempt.quiz_id,
+        Quiz.curriculum_id,
+        QuizAttempt.score,
+        QuizAttempt.completed_at,
+        **filters
+    ).filter(QuizAttempt.score.isnot(None))
+    if since is not None:
+        query = query.filter(QuizAttempt.completed_at >= since)
+    rows = query.order_by(QuizAttempt.completed_at, QuizAttempt.id).all()
+    return pd.DataFrame.from_records(rows, columns=list(DTYPES)).astype(DTYPES)
+
+def _load_names(frame, known=None):
+    """Çerçevedeki kimliklerin adları; known verilirse yalnızca yeni kimlikler sorgulanır"""
+    names = {}
+    for kind, model, name_column in (('student', Student, Student.name),
+                                     ('quiz', Quiz, Quiz.title),
+                                     ('curriculum', Curriculum, Curriculum.title)):
+        ids = frame[f'{kind}_id']
+        if known is None:
+            names[kind] = _names(model.id, name_column, ids)
+        else:
+            added = _names(model.id, name_column, ids[~ids.isin(known[kind].index)])
+            names[kind] = pd.concat([known[kind], added]) if len(added) else known[kind]
+    return names
+
+def _improvement_rates(scores, keys):
+    """Grup başına gelişim oranı
+
+    En yeni 5 denemenin ortalaması en eski 5 denemenin ortalamasıyla karşılaştırılır;
+    5'ten az deneme varsa tüm denemelerin ortalaması en eski denemeyle karşılaştırılır.
+    scores tamamlanma zamanına göre eskiden yeniye sıralı olmalıdır.
+    """
+    grouped = scores.groupby(keys, sort=False)
+    oldest_rank = grouped.cumcount()
+    size = grouped.transform('size')
+    newest_rank = size - oldest_rank - 1
+    older_limit = np.where(size >= TREND_WINDOW, TREND_WINDOW, 1)
+
+    recent = scores.where(newest_rank < TREND_WINDOW).groupby(keys).mean()
+    older = scores.where(oldest_rank < older_limit).groupby(keys).mean()
+    counts = grouped.size()
+    rates = (recent - older) / older * 100
+    return rates.where((counts >= 2) & (older != 0), 0.0).fillna(0.0)
+
+class Cohort:
+    """Bir öğrencinin (veya bir öğretmenin sınıfının) puanlı denemelerinin sütunlu anlık görüntüsü
+
+    Denemeler tamamlanma zamanına göre eskiden yeniye sıralı tek bir DataFrame'de tutulur;
+    gelişim, son denemeler ve müfredat zorluğu bu çerçeve üzerinde vektörel işlemlerle
+    hesaplanır. Sınıfın tamamı için aynı metrikler analytics_queries ile veritabanında
+    hesaplanır. Öğrenci, quiz ve müfredat adları ayrı küçük tablolarda tutulur.
+    Görüntü değiştirilmez; yeni denemeler refresh() ile yeni bir görüntüye eklenir.
+    """
+
+    def __init__(self, frame, names, loaded_at=None):
+        self.frame = frame
+        self.names = names
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+
+    @classmethod
+    def load(cls, **filters):
+        """Kapsamın (teacher_id veya student_id) tüm puanlı denemelerini yükle"""
+        frame = _attempt_frame(filters)
+        return cls(frame, _load_names(frame))
+
+    def refresh(self, **filters):
+        """Yalnızca son yüklemeden sonra kaydedilen denemeleri okuyup eklenmiş yeni görüntü döndür"""
+        if self.frame.empty:
+            return Cohort.load(**filters)
+        completed_at = self.frame['completed_at']
+        since = completed_at.iloc[-1] - RELOAD_OVERLAP
+        recent = _attempt_frame(filters, since.to_pydatetime())
+        known = self.frame['attempt_id'].iloc[completed_at.searchsorted(since):]
+        recent = recent[~recent['attempt_id'].isin(known)]
+        if recent.empty:
+            return self
+
+        frame = pd.concat([self.frame, recent], ignore_index=True)
+        if recent['completed_at'].iloc[0] < completed_at.iloc[-1]:
+            frame = frame.sort_values(['completed_at', 'attempt_id'], kind='stable', ignore_index=True)
+        return Cohort(frame, _load_names(recent, self.names), self.loaded_at)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def scores(self):
+        # Hesaplamalar float64 ile yapılır; float32 yalnızca saklama içindir
+        return self.frame['score'].astype('float64')
+
+    def improvement_rate(self):
+        if self.frame.empty:
+            return 0.0
+        return float(_improvement_rates(self.scores, np.zeros(len(self.frame), dtype=np.int8)).iloc[0])
+
+    def recent_trend(self, limit=10):
+        """En yeni denemeler ve yeniden eskiye kümülatif hareketli ortalama"""
+        newest = self.frame.iloc[::-1].head(limit)
+        moving_averages = newest['score'].astype('float64').expanding().mean()
+        dates = newest['completed_at'].dt.strftime('%Y-%m-%d')
+        quizzes = newest['quiz_id'].map(self.names['quiz'])
+        students = newest['student_id'].map(self.names['student']).fillna('Unknown')
+        curricula = newest['curriculum_id'].map(self.names['curriculum'])
+        return [{
+            'date': date,
+            'score': float(score),
+            'quiz': quiz,
+            'student': student,
+            'curriculum': curriculum,
+            'moving_average': float(moving_average)
+        } for date, score, quiz, student, curriculum, moving_average in zip(
+            dates, newest['score'], quizzes, students, curricula, moving_averages)]
+
+    def curriculum_performance(self):
+        """Müfredat başlığına göre performans; ortalaması düşük müfredatlar daha zordur"""
+        if self.frame.empty:
+            return {}
+        scores = self.scores
+        titles = self.frame['curriculum_id'].map(self.names['curriculum'])
+        grouped = scores.groupby(titles)
+        stats = grouped.agg(['count', 'sum', 'mean', 'std'])
+        quartiles = grouped.quantile(list(QUARTILES)).unstack()
+        student_counts = self.frame['student_id'].groupby(titles).nunique()
+        rates = _improvement_rates(scores, titles)
+
+        newest = self.frame.iloc[::-1].assign(title=titles)
+        newest = newest[newest.groupby('title').cumcount() < TREND_WINDOW]
+        recent_scores = {
+            title: [{'date': moment.strftime('%Y-%m-%d'), 'score': float(score)}
+                    for moment, score in zip(group['completed_at'], group['score'])]
+            for title, group in newest.groupby('title', sort=False)
+        }
+
+        performance = {}
+        for title, row in stats.iterrows():
+            count = int(row['count'])
+            title_quartiles = [float(q) for q in quartiles.loc[title]] if count > 1 else [0, 0, 0]
+            performance[title] = {
+                'attempts': count,
+                'total_score': float(row['sum']),
+                'average': float(row['mean']),
+                'median': float(quartiles.loc[title, QUARTILES[1]]),
+                'std_dev': float(row['std']) if count > 1 else 0.0,
+                'quartiles': title_quartiles,
+                'student_count': int(student_counts[title]),
+                'recent_scores': recent_scores.get(title, []),
+                'improvement_rate': float(rates.get(title, 0.0))
+            }
+        return performance
+
+def snapshot(scope, scope_id):
+    """Öğretmen (rollups.SCOPE_TEACHER) veya öğrenci kapsamının anlık görüntüsü
+
+    Görüntü bellekte tutulur. Özet tablosundaki sürüm değiştiğinde, yani yeni bir deneme
+    kaydedildiğinde yalnızca yeni denemeler okunup eklenir. Silinen denemelerin de
+    yansıması için görüntü en fazla COHORT_CACHE_TTL saniyede bir baştan yüklenir.
+    """
+    key = f"{scope}_{scope_id}"
+    version = rollups.data_version(scope, scope_id)
+    cached = _cache().get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    filters = {'teacher_id': scope_id} if scope == rollups.SCOPE_TEACHER else {'student_id': scope_id}
+    if cached is not None and time.monotonic() - cached[1].loaded_at < _cache().ttl:
+        cohort = cached[1].refresh(**filters)
+    else:
+        cohort = Cohort.load(**filters)
+    _cache().set(key, (version, cohort))
+    return cohort
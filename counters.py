@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, TeacherCounter, Student, QuizAssignment
+
+COUNTERS = ('total_students', 'active_quizzes', 'completed_quizzes')
+
+def compute(teacher_id):
+    """Öğretmenin sayaçlarını tek bir toplama sorgusuyla kaynak tablolardan hesapla"""
+    completed = QuizAssignment.completed.is_(True)
+    students, assignments, completed_count = db.session.query(
+        func.count(func.distinct(Student.id)),
+        func.count(QuizAssignment.id),
+        func.count(QuizAssignment.id).filter(completed)
+    ).select_from(Student)\
+        .outerjoin(QuizAssignment, QuizAssignment.student_id == Student.id)\
+        .filter(Student.teacher_id == teacher_id)\
+        .one()
+    return {
+        'total_students': students,
+        'active_quizzes': assignments - completed_count,
+        'completed_quizzes': completed_count
+    }
+
+def _insert(teacher_id):
+    """Hesaplanan sayaçlarla satır ekleyen, çakışma (upsert) destekli INSERT"""
+    insert = postgresql.insert if db.session.get_bind().dialect.name == 'postgresql' else sqlite.insert
+    return insert(TeacherCounter).values(teacher_id=teacher_id, updated_at=datetime.utcnow(), **compute(teacher_id))
+
+def get(teacher_id):
+    """Öğretmenin sayaçları; satır yoksa hesaplanıp kaydedilir"""
+    counter = db.session.get(TeacherCounter, teacher_id)
+    if counter is None:
+        # Eşzamanlı bir istek satırı önce oluşturduysa onunki kullanılır
+        db.session.execute(_insert(teacher_id).on_conflict_do_nothing(index_elements=['teacher_id']))
+        db.session.commit()
+        counter = db.session.get(TeacherCounter, teacher_id)
+    return {name: getattr(counter, name) for name in COUNTERS}
+
+def increment(teacher_id, **deltas):
+    """Sayaçları veritabanında atomik olarak artır (UPDATE ... SET x = x + n)
+
+    Çağıranın işlemi içinde ve kaynak tablolardaki değişiklikten sonra çağrılmalıdır. Satır
+    yoksa sayaçlar bu değişiklik de dahil hesaplanarak eklenir. Bu sırada başka bir istek
+    satırı eklediyse, onun hesabı bu işlemin henüz commit edilmemiş değişikliğini
+    içermediği için yalnızca fark eklenir.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    columns = TeacherCounter.__table__.c
+    updated = TeacherCounter.query.filter_by(teacher_id=teacher_id).update(
+        {getattr(TeacherCounter, name): getattr(TeacherCounter, name) + delta for name, delta in deltas.items()},
+        synchronize_session=False
+    )
+    if updated:
+        return
+    values = {name: columns[name] + delta for name, delta in deltas.items()}
+    values['updated_at'] = datetime.utcnow()
+    db.session.execute(_insert(teacher_id).on_conflict_do_update(index_elements=['teacher_id'], set_=values))
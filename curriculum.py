@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import json
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
+from sqlalchemy.orm import defer, joinedload
 from models import Curriculum, db, Student, Quiz, QuizAssignment
-from ai_service import generate_curriculum_content, AIServiceError
+from jobs import job_queue
+from ai_service import stream_curriculum_content, AIServiceError
+from question_bank import request_refill
+import fragment_cache
 
 curriculum_bp = Blueprint('curriculum', __name__)
 
@@ -31,31 +36,69 @@ def create():
                                 form_data={'title': title, 'topic': topic, 'level': level})
         
         try:
-            # Generate content using Gemini AI
-            content = generate_curriculum_content(topic, level)
+            # Generate content in the background so the worker is not held by Gemini
+            job = job_queue.enqueue('curriculum', current_user.id,
+                                    author_id=current_user.id, title=title, topic=topic, level=level)
+            
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'job_id': job.id, 'status_url': url_for('jobs.status', job_id=job.id)}), 202
+            
+            flash('Müfredat arka planda oluşturuluyor. Hazır olduğunda bildirim alacaksınız.', 'info')
+            return redirect(url_for('curriculum.list'))
+            
+        except Exception as e:
+            flash('Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.', 'error')
+            return render_template('curriculum/create.html', 
+                                form_data={'title': title, 'topic': topic, 'level': level})
+    
+    return render_template('curriculum/create.html', form_data={})
+
+@curriculum_bp.route('/curriculum/create/stream', methods=['POST'])
+@login_required
+@teacher_required
+def create_stream():
+    title = request.form.get('title', '').strip()
+    topic = request.form.get('topic', '').strip()
+    level = request.form.get('level', '').strip()
+    
+    if not title or not topic or not level:
+        return jsonify({'error': 'Tüm alanların doldurulması zorunludur.'}), 400
+    
+    author_id = current_user.id
+    
+    def _event(**data):
+        return json.dumps(data, ensure_ascii=False) + '\n'
+    
+    def generate():
+        parts = []
+        try:
+            # Stream markdown chunks to the browser as Gemini produces them
+            for chunk in stream_curriculum_content(topic, level, owner_id=author_id):
+                parts.append(chunk)
+                yield _event(type='chunk', text=chunk)
             
             curriculum = Curriculum(
                 title=title,
-                content=content,
-                author_id=current_user.id
+                content=''.join(parts),
+                author_id=author_id
             )
-            
             db.session.add(curriculum)
             db.session.commit()
+            request_refill(curriculum.id, author_id)
             
-            flash('Müfredat başarıyla oluşturuldu!', 'success')
-            return redirect(url_for('curriculum.view', id=curriculum.id))
+            yield _event(type='done', id=curriculum.id, url=url_for('curriculum.view', id=curriculum.id))
             
         except AIServiceError as e:
-            flash(str(e), 'error')
-            return render_template('curriculum/create.html', 
-                                form_data={'title': title, 'topic': topic, 'level': level})
+            yield _event(type='error', message=str(e))
         except Exception as e:
-            flash('Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.', 'error')
-            return render_template('curriculum/create.html', 
-                                form_data={'title': title, 'topic': topic, 'level': level})
+            db.session.rollback()
+            yield _event(type='error', message='Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.')
     
-    return render_template('curriculum/create.html', form_data={})
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @curriculum_bp.route('/curriculum')
 @login_required
@@ -66,19 +109,26 @@ def list():
 @curriculum_bp.route('/curriculum/<int:id>')
 @login_required
 def view(id):
-    curriculum = Curriculum.query.get_or_404(id)
-    assigned_quizzes = curriculum.quizzes
+    # İçerik sütunu yalnızca önbellekte parça yoksa yüklenir; yazar adı her istekte
+    # güncel okunur, bu yüzden önbelleğe alınan parçanın dışında gösterilir
+    curriculum = Curriculum.query.options(defer(Curriculum.content), joinedload(Curriculum.author)).get_or_404(id)
+    content_html = fragment_cache.curriculum_content(curriculum)
     
-    if not current_user.is_teacher:
+    # Kenar çubuğu için yalnızca quiz kimliği ve başlığı gerekir
+    quizzes = db.session.query(Quiz.id, Quiz.title).filter(Quiz.curriculum_id == curriculum.id)
+    assigned_quizzes = []
+    if current_user.is_teacher:
+        assigned_quizzes = quizzes.order_by(Quiz.id).all()
+    else:
         student = Student.query.filter_by(email=current_user.email).first()
         if student:
-            assigned_quizzes = Quiz.query.join(QuizAssignment).filter(
-                Quiz.curriculum_id == curriculum.id,
+            assigned_quizzes = quizzes.join(QuizAssignment).filter(
                 QuizAssignment.student_id == student.id,
                 QuizAssignment.completed == False
-            ).all()
+            ).order_by(Quiz.id).all()
             
-    return render_template('curriculum/view.html', curriculum=curriculum, assigned_quizzes=assigned_quizzes)
+    return render_template('curriculum/view.html', curriculum=curriculum, content_html=content_html,
+                           assigned_quizzes=assigned_quizzes)
 
 @curriculum_bp.route('/curriculum/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -102,6 +152,10 @@ def edit(id):
             curriculum.title = title
             curriculum.content = content
             db.session.commit()
+            fragment_cache.invalidate(fragment_cache.CURRICULUM, curriculum.id)
+            
+            # Soru bankası yeni sürüme göre arka planda yeniden doldurulur
+            request_refill(curriculum.id, current_user.id)
             flash('Müfredat başarıyla güncellendi!', 'success')
             return redirect(url_for('curriculum.view', id=curriculum.id))
         except Exception as e:
@@ -1,41 +1,43 @@
-from flask import Blueprint, render_template
+import os
+from flask import Blueprint, render_template, request, current_app
 from flask_login import login_required, current_user
-from models import Curriculum, Student, QuizAttempt, QuizAssignment, Quiz
-from sqlalchemy import desc, and_
+from models import Curriculum, Student, QuizAttempt, Quiz
+from sqlalchemy import desc
+from sqlalchemy.orm import joinedload, contains_eager
+import rollups
+import counters
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/')
 @login_required
 def index():
-    curricula = Curriculum.query.all()
-    
-    # Get quiz scores for the progress chart with proper filtering and joins
-    base_query = QuizAttempt.query\
-        .join(Quiz)\
-        .join(Quiz.curriculum)
-    
+    # İlerleme grafiği günlük özet satırlarından çizilir (gün başına ortalama puan)
     if current_user.is_teacher:
-        attempts = base_query\
-            .join(Student, QuizAttempt.student_id == Student.id)\
-            .filter(
-                Student.teacher_id == current_user.id,
-                QuizAttempt.student_id.isnot(None)
-            )\
-            .order_by(QuizAttempt.completed_at)\
-            .all()
+        daily = rollups.daily_rollups(rollups.SCOPE_TEACHER, [current_user.id]).get(current_user.id, [])
+        curriculum_author_id = current_user.id
     else:
         student = Student.query.filter_by(email=current_user.email).first()
-        attempts = base_query\
-            .filter(
-                QuizAttempt.user_id == current_user.id,
-                QuizAttempt.student_id == student.id if student else None
-            )\
-            .order_by(QuizAttempt.completed_at)\
-            .all()
+        daily = rollups.daily_rollups(rollups.SCOPE_STUDENT, [student.id]).get(student.id, []) if student else []
+        curriculum_author_id = student.teacher_id if student else current_user.id
+    
+    # Yalnızca öğretmenin (öğrenciler için kendi öğretmeninin) müfredatları, sayfa sayfa
+    per_page = int(current_app.config.get('DASHBOARD_CURRICULA_PER_PAGE') or os.environ.get('DASHBOARD_CURRICULA_PER_PAGE', 10))
+    curricula = Curriculum.query\
+        .filter_by(author_id=curriculum_author_id)\
+        .order_by(desc(Curriculum.updated_at), desc(Curriculum.id))\
+        .paginate(page=request.args.get('page', 1, type=int), per_page=per_page, error_out=False)
+    
+    dates = [row.period for row in daily]
+    scores = [round(row.total / row.count, 1) for row in daily]
     
-    dates = [attempt.completed_at.strftime('%Y-%m-%d') for attempt in attempts]
-    scores = [attempt.score for attempt in attempts]
+    # Kullanıcının son 5 denemesi; quiz başlıkları aynı sorguda yüklenir
+    my_recent_attempts = QuizAttempt.query\
+        .filter_by(user_id=current_user.id)\
+        .options(joinedload(QuizAttempt.quiz))\
+        .order_by(desc(QuizAttempt.id))\
+        .limit(5)\
+        .all()[::-1]
     
     # Additional data for teachers
     recent_student_attempts = []
@@ -48,6 +50,7 @@ def index():
         recent_student_attempts = QuizAttempt.query\
             .join(Student, QuizAttempt.student_id == Student.id)\
             .join(Quiz)\
+            .options(contains_eager(QuizAttempt.student_profile), contains_eager(QuizAttempt.quiz))\
             .filter(
                 Student.teacher_id == current_user.id,
                 QuizAttempt.student_id.isnot(None)
@@ -56,20 +59,11 @@ def index():
             .limit(10)\
             .all()
         
-        # Calculate statistics
-        total_students = Student.query.filter_by(teacher_id=current_user.id).count()
-        
-        # Count active and completed quizzes with proper joins
-        quiz_assignments = QuizAssignment.query\
-            .join(Student)\
-            .filter(
-                Student.teacher_id == current_user.id,
-                QuizAssignment.student_id.isnot(None)
-            )\
-            .all()
-        
-        active_quizzes = len([a for a in quiz_assignments if not a.completed])
-        completed_quizzes = len([a for a in quiz_assignments if a.completed])
+        # Sayaçlar öğrenci, atama ve deneme kaydedilirken güncellenen tablodan okunur
+        stats = counters.get(current_user.id)
+        total_students = stats['total_students']
+        active_quizzes = stats['active_quizzes']
+        completed_quizzes = stats['completed_quizzes']
     
     return render_template(
         'dashboard/index.html',
@@ -77,6 +71,7 @@ def index():
         dates=dates,
         scores=scores,
         recent_student_attempts=recent_student_attempts,
+        my_recent_attempts=my_recent_attempts,
         total_students=total_students,
         active_quizzes=active_quizzes,
         completed_quizzes=completed_quizzes
@@ -0,0 +1,54 @@
+import os
+from flask import current_app, render_template
+from markupsafe import Markup
+from ai_cache import MemoryCache
+from models import db, Question
+
+# Parça türleri; anahtar tür ve nesne kimliğinden oluşur
+CURRICULUM = 'curriculum'
+QUIZ = 'quiz'
+
+_fragments = None
+
+def _cache():
+    global _fragments
+    if _fragments is None:
+        _fragments = MemoryCache(
+            max_entries=int(current_app.config.get('FRAGMENT_CACHE_SIZE') or os.environ.get('FRAGMENT_CACHE_SIZE', 256)),
+            ttl=int(current_app.config.get('FRAGMENT_CACHE_TTL') or os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+        )
+    return _fragments
+
+def fragment(kind, object_id, version, render):
+    """Sayfa parçasını önbellekten döndür; yoksa veya sürümü değişmişse render() ile oluştur
+
+    Parçalar kullanıcıya özgü bilgi içermemelidir; aynı nesneyi açan herkese aynı HTML
+    gönderilir. Sürüm (ör. updated_at) değiştiğinde eski parça kendiliğinden geçersiz olur,
+    böylece önbelleği açıkça temizlemeyen diğer süreçler de güncel içeriği gösterir.
+    """
+    key = f"{kind}_{object_id}"
+    cached = _cache().get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    html = Markup(render())
+    _cache().set(key, (version, html))
+    return html
+
+def invalidate(kind, object_id):
+    _cache().delete(f"{kind}_{object_id}")
+
+def curriculum_content(curriculum):
+    """Müfredatın içerik bölümü; içerik yalnızca önbellekte yoksa yüklenir"""
+    return fragment(CURRICULUM, curriculum.id, curriculum.updated_at,
+                    lambda: render_template('curriculum/_content.html', curriculum=curriculum))
+
+def quiz_questions(quiz):
+    """Quiz formundaki sorular; sorular quiz oluşturulduktan sonra değişmez"""
+    def render():
+        questions = db.session.query(Question.id, Question.question_text, Question.options)\
+            .filter(Question.quiz_id == quiz.id)\
+            .order_by(Question.id)\
+            .all()
+        return render_template('quiz/_questions.html', questions=questions)
+    return fragment(QUIZ, quiz.id, quiz.created_at, render)
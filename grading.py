@@ -0,0 +1,114 @@
+import os
+from flask import current_app
+from ai_cache import MemoryCache
+from models import db, Question, AttemptResponse
+
+UNANSWERED = 255
+
+_keys = None
+
+def _cache():
+    global _keys
+    if _keys is None:
+        _keys = MemoryCache(
+            max_entries=int(current_app.config.get('ANSWER_KEY_CACHE_SIZE') or os.environ.get('ANSWER_KEY_CACHE_SIZE', 1024)),
+            ttl=int(current_app.config.get('ANSWER_KEY_CACHE_TTL') or os.environ.get('ANSWER_KEY_CACHE_TTL', 3600))
+        )
+    return _keys
+
+class GradeResult:
+    """Tek gönderimin notu: soru başına seçilen seçenek ve doğru cevap bit maskesi"""
+
+    __slots__ = ('choices', 'correct_mask', 'total')
+
+    def __init__(self, choices, correct_mask, total):
+        self.choices = choices
+        self.correct_mask = correct_mask
+        self.total = total
+
+    @property
+    def correct_count(self):
+        return self.correct_mask.bit_count()
+
+    @property
+    def score(self):
+        return self.correct_count / self.total * 100 if self.total else 0.0
+
+    def to_response(self):
+        return AttemptResponse(choices=self.choices, correct_mask=mask_to_bytes(self.correct_mask, self.total))
+
+class AnswerKey:
+    """Bir quiz'in derlenmiş cevap anahtarı
+
+    Sorular kimlik sırasıyla tutulur; her soru için seçenek metninden indekse eşleme ve
+    doğru seçeneğin indeksi saklanır. Doğru cevap seçenekler arasında yoksa seçeneklerin
+    sonuna gizli bir indeksle eklenir, böylece notlandırma hep tam sayı karşılaştırmasıdır.
+    """
+
+    __slots__ = ('quiz_id', 'question_ids', 'fields', 'options', 'indexes', 'correct')
+
+    def __init__(self, quiz_id, questions):
+        self.quiz_id = quiz_id
+        self.question_ids = []
+        self.fields = []
+        self.options = []
+        self.indexes = []
+        self.correct = []
+        for question_id, options, correct_answer in questions:
+            choices = list(options or [])
+            if correct_answer not in choices:
+                choices.append(correct_answer)
+            index = {}
+            for position, text in enumerate(choices):
+                index.setdefault(text, position)
+            self.question_ids.append(question_id)
+            self.fields.append(f'question_{question_id}')
+            self.options.append(choices)
+            self.indexes.append(index)
+            self.correct.append(index[correct_answer])
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def grade(self, answers):
+        """Form verisini (question_<id> -> seçenek metni) notlandır"""
+        choices = bytearray(len(self.question_ids))
+        mask = 0
+        for position, (field, index, correct) in enumerate(zip(self.fields, self.indexes, self.correct)):
+            choice = index.get(answers.get(field), UNANSWERED)
+            choices[position] = choice
+            if choice == correct:
+                mask |= 1 << position
+        return GradeResult(bytes(choices), mask, len(self.question_ids))
+
+    def decode(self, response):
+        """Kayıtlı cevapları soru kimliğinden seçilen seçenek metnine çevir"""
+        answers = {}
+        if response is None:
+            return answers
+        for position, choice in enumerate(response.choices[:len(self.question_ids)]):
+            if choice != UNANSWERED and choice < len(self.options[position]):
+                answers[self.question_ids[position]] = self.options[position][choice]
+        return answers
+
+def mask_to_bytes(mask, total):
+    return mask.to_bytes((total + 7) // 8, 'little')
+
+def mask_from_bytes(data):
+    return int.from_bytes(data, 'little')
+
+def answer_key(quiz_id):
+    """Quiz'in cevap anahtarı; ilk kullanımda tek sorguyla derlenip bellekte tutulur"""
+    key = _cache().get(quiz_id)
+    if key is None:
+        questions = db.session.query(Question.id, Question.options, Question.correct_answer)\
+            .filter(Question.quiz_id == quiz_id)\
+            .order_by(Question.id)\
+            .all()
+        key = AnswerKey(quiz_id, questions)
+        _cache().set(quiz_id, key)
+    return key
+
+def invalidate(quiz_id):
+    """Quiz'in soruları yazıldığında derlenmiş anahtarı bu süreçten sil"""
+    _cache().delete(quiz_id)
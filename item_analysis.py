@@ -0,0 +1,168 @@
+import math
+import click
+from sqlalchemy.exc import IntegrityError
+from models import db, ItemStat, Question, Quiz, Curriculum, QuizAttempt, AttemptResponse
+from grading import UNANSWERED, GradeResult, answer_key, mask_from_bytes
+
+# Doğru cevaplama oranı (%) ve ayırt edicilik için uyarı eşikleri
+HARD_THRESHOLD = 30
+EASY_THRESHOLD = 90
+LOW_DISCRIMINATION = 0.2
+
+def _new_stat(question_id, quiz_id):
+    return ItemStat(question_id=question_id, quiz_id=quiz_id, attempts=0, correct=0, unanswered=0,
+                    rest_sum=0, rest_sum_squares=0, rest_sum_correct=0, option_counts={})
+
+def _apply(stat, position, result):
+    """Tek gönderimin bir sorusunu istatistik satırına ekle"""
+    is_correct = bool(result.correct_mask >> position & 1)
+    rest = result.correct_count - is_correct
+    stat.attempts = (stat.attempts or 0) + 1
+    stat.rest_sum = (stat.rest_sum or 0) + rest
+    stat.rest_sum_squares = (stat.rest_sum_squares or 0) + rest * rest
+    if is_correct:
+        stat.correct = (stat.correct or 0) + 1
+        stat.rest_sum_correct = (stat.rest_sum_correct or 0) + rest
+    choice = result.choices[position]
+    if choice == UNANSWERED:
+        stat.unanswered = (stat.unanswered or 0) + 1
+    else:
+        # JSON sütununun değiştiği algılansın diye yeni sözlük ata
+        counts = dict(stat.option_counts or {})
+        counts[str(choice)] = counts.get(str(choice), 0) + 1
+        stat.option_counts = counts
+
+def _locked_stats(key):
+    """Quiz'in soru istatistiklerini kilitleyerek getir; eksik satırları oluştur"""
+    query = ItemStat.query.filter_by(quiz_id=key.quiz_id).order_by(ItemStat.question_id).with_for_update()
+    stats = {stat.question_id: stat for stat in query.all()}
+    missing = [question_id for question_id in key.question_ids if question_id not in stats]
+    if missing:
+        try:
+            with db.session.begin_nested():
+                for question_id in missing:
+                    stats[question_id] = _new_stat(question_id, key.quiz_id)
+                    db.session.add(stats[question_id])
+        except IntegrityError:
+            # Eşzamanlı bir istek satırları önce oluşturdu
+            stats = {stat.question_id: stat for stat in query.all()}
+    return stats
+
+def record_response(key, result):
+    """Notlandırılan gönderimi soru istatistiklerine ekle
+
+    Çağıranın işlemi (transaction) içinde çalışır; bir gönderim quiz'in tüm satırlarını
+    soru kimliği sırasıyla kilitler.
+    """
+    if not len(key):
+        return
+    stats = _locked_stats(key)
+    for position, question_id in enumerate(key.question_ids):
+        _apply(stats[question_id], position, result)
+
+def item_metrics(stat):
+    """Zorluk (doğru cevaplama oranı, %) ve ayırt edicilik (nokta çift serili korelasyon)
+
+    Ayırt edicilik, sorunun doğru/yanlış cevabı ile öğrencinin diğer sorulardaki doğru
+    sayısı arasındaki korelasyondur; herkes aynı cevabı verdiyse tanımsızdır (None).
+    """
+    attempts = stat.attempts or 0
+    if not attempts:
+        return None
+    correct = stat.correct or 0
+    proportion = correct / attempts
+    discrimination = None
+    if 0 < correct < attempts:
+        mean = stat.rest_sum / attempts
+        variance = stat.rest_sum_squares / attempts - mean * mean
+        if variance > 1e-12:
+            mean_correct = stat.rest_sum_correct / correct
+            mean_incorrect = (stat.rest_sum - stat.rest_sum_correct) / (attempts - correct)
+            discrimination = (mean_correct - mean_incorrect) / math.sqrt(variance) \
+                * math.sqrt(proportion * (1 - proportion))
+
+    difficulty = proportion * 100
+    flags = []
+    if difficulty < HARD_THRESHOLD:
+        flags.append('Zor')
+    elif difficulty > EASY_THRESHOLD:
+        flags.append('Kolay')
+    if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+        flags.append('Düşük ayırt edicilik')
+    return {
+        'attempts': attempts,
+        'correct': correct,
+        'unanswered': stat.unanswered or 0,
+        'difficulty': difficulty,
+        'discrimination': discrimination,
+        'flags': flags
+    }
+
+def quiz_item_analysis(quiz_id):
+    """Quiz'in her sorusu için metrikler ve seçenek dağılımı; önceden toplanmış satırlardan okunur"""
+    key = answer_key(quiz_id)
+    stats = {stat.question_id: stat for stat in ItemStat.query.filter_by(quiz_id=quiz_id).all()}
+    analysis = {}
+    for position, question_id in enumerate(key.question_ids):
+        stat = stats.get(question_id)
+        metrics = item_metrics(stat) if stat else None
+        if metrics is None:
+            continue
+        counts = stat.option_counts or {}
+        metrics['options'] = [{
+            'option': option,
+            'count': counts.get(str(index), 0),
+            'percent': counts.get(str(index), 0) / metrics['attempts'] * 100,
+            'correct': index == key.correct[position]
+        } for index, option in enumerate(key.options[position])]
+        analysis[question_id] = metrics
+    return analysis
+
+def teacher_item_summary(teacher_id, limit=10):
+    """Öğretmenin quizlerinde doğru cevaplama oranı en düşük sorular"""
+    rows = db.session.query(ItemStat, Question.question_text, Quiz.title)\
+        .join(Question, ItemStat.question_id == Question.id)\
+        .join(Quiz, ItemStat.quiz_id == Quiz.id)\
+        .join(Curriculum, Quiz.curriculum_id == Curriculum.id)\
+        .filter(Curriculum.author_id == teacher_id, ItemStat.attempts > 0)\
+        .order_by((ItemStat.correct * 1.0 / ItemStat.attempts).asc(), ItemStat.attempts.desc())\
+        .limit(limit)\
+        .all()
+    summary = []
+    for stat, question_text, quiz_title in rows:
+        metrics = item_metrics(stat)
+        metrics.update({'question': question_text, 'quiz': quiz_title, 'quiz_id': stat.quiz_id})
+        summary.append(metrics)
+    return summary
+
+def rebuild():
+    """Soru istatistiklerini kayıtlı cevaplardan (attempt_response) yeniden oluştur"""
+    stats = {}
+    responses = db.session.query(QuizAttempt.quiz_id, AttemptResponse.choices, AttemptResponse.correct_mask)\
+        .join(AttemptResponse, AttemptResponse.attempt_id == QuizAttempt.id)\
+        .filter(QuizAttempt.student_id.isnot(None))\
+        .order_by(QuizAttempt.quiz_id)\
+        .yield_per(5000)
+
+    for quiz_id, choices, correct_mask in responses:
+        key = answer_key(quiz_id)
+        if len(choices) != len(key):
+            continue
+        result = GradeResult(choices, mask_from_bytes(correct_mask), len(key))
+        for position, question_id in enumerate(key.question_ids):
+            stat = stats.get(question_id)
+            if stat is None:
+                stat = stats[question_id] = _new_stat(question_id, quiz_id)
+            _apply(stat, position, result)
+
+    ItemStat.query.delete(synchronize_session=False)
+    db.session.add_all(stats.values())
+    db.session.commit()
+    return len(stats)
+
+def init_app(app):
+    @app.cli.command('rebuild-item-stats')
+    def rebuild_item_stats_command():
+        """Soru analizi istatistiklerini kayıtlı cevaplardan yeniden oluştur"""
+        count = rebuild()
+        click.echo(f"{count} soru istatistiği oluşturuldu")
@@ -0,0 +1,223 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Blueprint, jsonify, url_for, current_app
+from flask_login import login_required, current_user
+from models import db, Curriculum, Quiz, Question, QuizAssignment
+from ai_service import generate_curriculum_content, generate_quiz_questions, get_stats
+from notifications import emit_job_update
+import counters
+import grading
+
+jobs_bp = Blueprint('jobs', __name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+class Job:
+    """Arka planda çalışan tek bir üretim işi"""
+
+    def __init__(self, kind, owner_id, payload):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.payload = payload
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+class LocalJobBackend:
+    """Harici servis gerektirmeyen, süreç içi iş parçacığı havuzu"""
+
+    def __init__(self, max_workers=4, max_finished_jobs=1000):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_finished_jobs = max_finished_jobs
+
+    def submit(self, job, runner):
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(runner, job)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _prune(self):
+        # Bellek sınırlı kalsın diye en eski bitmiş işleri at
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job_id]
+
+class JobQueue:
+    """İş türlerini kaydeden ve işleri arka uca ileten kuyruk"""
+
+    def __init__(self):
+        self.app = None
+        self.backend = None
+        self._handlers = {}
+
+    def init_app(self, app, backend=None):
+        self.app = app
+        if backend is None:
+            max_workers = int(app.config.get('AI_JOB_WORKERS') or os.environ.get('AI_JOB_WORKERS', 4))
+            backend = LocalJobBackend(max_workers=max_workers)
+        self.backend = backend
+
+    def task(self, kind):
+        def decorator(f):
+            self._handlers[kind] = f
+            return f
+        return decorator
+
+    def enqueue(self, kind, owner_id, **payload):
+        if kind not in self._handlers:
+            raise ValueError(f"Bilinmeyen iş türü: {kind}")
+        job = Job(kind, owner_id, payload)
+        self.backend.submit(job, self._run)
+        return job
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def _run(self, job):
+        with self.app.app_context():
+            job.status = JOB_RUNNING
+            job.started_at = datetime.utcnow()
+            emit_job_update(job)
+            try:
+                job.result = self._handlers[job.kind](**job.payload)
+                job.status = JOB_SUCCEEDED
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Arka plan işi başarısız ({job.kind}, {job.id}): {str(e)}")
+                job.error = str(e)
+                job.status = JOB_FAILED
+            finally:
+                job.finished_at = datetime.utcnow()
+                db.session.remove()
+            emit_job_update(job)
+
+job_queue = JobQueue()
+
+def init_app(app):
+    job_queue.init_app(app)
+
+@job_queue.task('curriculum')
+def generate_curriculum_job(author_id, title, topic, level):
+    """Müfredat içeriğini üret ve kaydet"""
+    content = generate_curriculum_content(topic, level, owner_id=author_id)
+
+    curriculum = Curriculum(
+        title=title,
+        content=content,
+        author_id=author_id
+    )
+    db.session.add(curriculum)
+    db.session.commit()
+
+    # Quiz oluşturma anında hazır olsun diye soru bankasını doldur
+    from question_bank import request_refill
+    request_refill(curriculum.id, author_id)
+
+    return {'curriculum_id': curriculum.id, 'title': curriculum.title}
+
+@job_queue.task('quiz')
+def generate_quiz_job(author_id, title, curriculum_id, num_questions, student_ids):
+    """Quiz sorularını üret, quiz'i kaydet ve öğrencilere ata"""
+    curriculum = db.session.get(Curriculum, curriculum_id)
+    if curriculum is None or curriculum.author_id != author_id:
+        raise ValueError("Müfredat bulunamadı")
+
+    questions_data = generate_quiz_questions(curriculum.content, num_questions, owner_id=author_id)
+
+    quiz = Quiz(
+        title=title,
+        curriculum_id=curriculum_id
+    )
+    db.session.add(quiz)
+    db.session.flush()
+
+    for q_data in questions_data:
+        db.session.add(Question(
+            quiz_id=quiz.id,
+            question_text=q_data['question'],
+            options=q_data['options'],
+            correct_answer=q_data['correct_answer']
+        ))
+
+    for student_id in student_ids:
+        db.session.add(QuizAssignment(
+            quiz_id=quiz.id,
+            student_id=student_id
+        ))
+    counters.increment(author_id, active_quizzes=len(student_ids))
+
+    db.session.commit()
+    grading.invalidate(quiz.id)
+    current_app.logger.info(f"Quiz başarıyla oluşturuldu: ID={quiz.id}")
+
+    # Soru bankası, aynı içerik için Gemini çağrıları çakışmasın diye quiz üretildikten sonra doldurulur
+    from question_bank import request_refill
+    request_refill(curriculum_id, author_id)
+
+    return {'quiz_id': quiz.id, 'curriculum_id': curriculum_id, 'title': quiz.title}
+
+def _result_url(job):
+    if job.status != JOB_SUCCEEDED or not job.result:
+        return None
+    if 'curriculum_id' in job.result:
+        return url_for('curriculum.view', id=job.result['curriculum_id'])
+    if 'report' in job.result:
+        return url_for('analytics.download_report', name=job.result['report'])
+    return None
+
+@jobs_bp.route('/jobs/<job_id>')
+@login_required
+def status(job_id):
+    job = job_queue.get(job_id)
+    if job is None or job.owner_id != current_user.id:
+        return jsonify({'error': 'İş bulunamadı'}), 404
+
+    data = job.to_dict()
+    data['url'] = _result_url(job)
+    return jsonify(data)
+
+@jobs_bp.route('/ai/stats')
+@login_required
+def ai_stats():
+    if not current_user.is_teacher:
+        return jsonify({'error': 'Erişim reddedildi'}), 403
+
+    stats = get_stats()
+    stats['jobs'] = {'pending': job_queue.backend.pending_count()}
+    return jsonify(stats)
@@ -42,6 +42,7 @@ class Curriculum(db.Model):
     
     # Relationships with cascade delete
     quizzes = db.relationship('Quiz', backref='curriculum', lazy=True, cascade='all, delete-orphan')
+    bank_items = db.relationship('QuestionBankItem', backref='curriculum', lazy=True, cascade='all, delete-orphan')
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -53,6 +54,7 @@ class Quiz(db.Model):
     questions = db.relationship('Question', backref='quiz', lazy=True, cascade='all, delete-orphan')
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True, cascade='all, delete-orphan')
     assignments = db.relationship('QuizAssignment', backref='quiz', lazy=True, cascade='all, delete-orphan')
+    bank_usages = db.relationship('QuizBankItem', backref='quiz', lazy=True, cascade='all, delete-orphan')
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -85,3 +87,91 @@ class QuizAssignment(db.Model):
     __table_args__ = (
         db.Index('idx_assignment_student', student_id, completed),  # Index for faster assignment lookups
     )
+
+class AIResponseCache(db.Model):
+    key = db.Column(db.String(64), primary_key=True)  # sha256(model + normalized prompt)
+    model_name = db.Column(db.String(100), nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    hits = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (
+        db.Index('idx_ai_cache_expires', expires_at),  # Index for expiry pruning
+        db.Index('idx_ai_cache_last_used', last_used_at),  # Index for LRU eviction
+    )
+
+class QuestionBankItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    curriculum_id = db.Column(db.Integer, db.ForeignKey('curriculum.id'), nullable=False)
+    question_text = db.Column(db.Text, nullable=False)
+    options = db.Column(db.JSON, nullable=False)
+    correct_answer = db.Column(db.Text, nullable=False)
+    topic = db.Column(db.String(200))
+    difficulty = db.Column(db.String(20), default='orta')
+    curriculum_version = db.Column(db.DateTime, nullable=False)  # Curriculum.updated_at when generated
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_bank_curriculum_version', curriculum_id, curriculum_version),  # Index for fresh bank lookups
+    )
+
+class QuizBankItem(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('question_bank_item.id', ondelete='CASCADE'), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('idx_quiz_bank_item', item_id),  # Index for "already seen" lookups
+    )
+
+class ScoreRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # student, curriculum or teacher
+    scope_id = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # 'all' or day as YYYY-MM-DD
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    sum_squares = db.Column(db.Float, nullable=False, default=0)
+    min_score = db.Column(db.Float)
+    max_score = db.Column(db.Float)
+    first_score = db.Column(db.Float)
+    last_score = db.Column(db.Float)
+    last_at = db.Column(db.DateTime)
+    histogram = db.Column(db.JSON, nullable=False, default=dict)  # {"<rounded score>": count}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint(scope, scope_id, period, name='uq_rollup_scope_period'),  # One row per scope and period
+    )
+
+class TeacherCounter(db.Model):
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_students = db.Column(db.Integer, nullable=False, default=0)
+    active_quizzes = db.Column(db.Integer, nullable=False, default=0)  # Assignments not yet completed
+    completed_quizzes = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AttemptResponse(db.Model):
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id', ondelete='CASCADE'), primary_key=True)
+    choices = db.Column(db.LargeBinary, nullable=False)  # One byte per question (ordered by Question.id): option index, 255 = unanswered
+    correct_mask = db.Column(db.LargeBinary, nullable=False)  # Little-endian bit mask, bit i set when question i is correct
+    
+    attempt = db.relationship('QuizAttempt', backref=db.backref('response', uselist=False, cascade='all, delete-orphan'))
+
+class ItemStat(db.Model):
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id', ondelete='CASCADE'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    unanswered = db.Column(db.Integer, nullable=False, default=0)
+    # Rest score = correct answers on the other questions of the attempt (for point-biserial)
+    rest_sum = db.Column(db.Float, nullable=False, default=0)
+    rest_sum_squares = db.Column(db.Float, nullable=False, default=0)
+    rest_sum_correct = db.Column(db.Float, nullable=False, default=0)
+    option_counts = db.Column(db.JSON, nullable=False, default=dict)  # {"<option index>": count}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_item_stat_quiz', quiz_id),  # Index for per-quiz lookups
+    )
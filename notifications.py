@@ -1,29 +1,209 @@
-from flask_socketio import SocketIO
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from flask_socketio import SocketIO, join_room
 from flask import current_app
 from flask_login import current_user
+from socket_bus import create_client_manager
 
 socketio = SocketIO()
 
+class NotificationBatcher:
+    """Bildirimleri oda başına kısa bir pencerede toplayıp tek mesaj olarak gönderen kuyruk
+
+    İstek yalnızca olayı kuyruğa ekler; gönderim arka plan görevinde yapılır. Her odada
+    bekleyen olay sayısı sınırlıdır (dolunca en eskiler atılır ve sayısı bildirilir). İstemci
+    onaylamadığı sürece bir odaya en fazla max_in_flight toplu mesaj gönderilir; yavaş
+    istemcilerin olayları birikir ve sonraki mesajda birleştirilir. Mesaj numaraları oda
+    başınadır; onay yalnızca onaylanan odanın bekleyen mesajlarını temizler.
+
+    Birden çok süreçte onay, mesajı gönderen süreçten farklı bir sürece gelebilir;
+    forward_ack verilmişse onay o sürece iletilir, verilmemişse onay takibi kapatılır.
+    """
+
+    def __init__(self, window=0.5, max_pending=200, max_in_flight=3, ack_timeout=10):
+        self.window = window
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.app = None
+        self.origin = uuid.uuid4().hex
+        self.track_acks = True
+        self.forward_ack = None
+        self._pending = {}
+        self._dropped = {}
+        self._in_flight = {}
+        self._sequences = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def init_app(self, app):
+        self.app = app
+        self.window = float(app.config.get('NOTIFICATION_BATCH_WINDOW') or os.environ.get('NOTIFICATION_BATCH_WINDOW', self.window))
+        self.max_pending = int(app.config.get('NOTIFICATION_MAX_PENDING') or os.environ.get('NOTIFICATION_MAX_PENDING', self.max_pending))
+        self.max_in_flight = int(app.config.get('NOTIFICATION_MAX_IN_FLIGHT') or os.environ.get('NOTIFICATION_MAX_IN_FLIGHT', self.max_in_flight))
+        self.ack_timeout = float(app.config.get('NOTIFICATION_ACK_TIMEOUT') or os.environ.get('NOTIFICATION_ACK_TIMEOUT', self.ack_timeout))
+
+    def enqueue(self, room, event):
+        with self._lock:
+            pending = self._pending.get(room)
+            if pending is None:
+                pending = self._pending[room] = deque(maxlen=self.max_pending)
+            if len(pending) == pending.maxlen:
+                self._dropped[room] = self._dropped.get(room, 0) + 1
+            pending.append(event)
+            # Gönderim görevi hiç başlamadıysa veya sonlandıysa yeniden başlat
+            if not _is_alive(self._task):
+                self._task = socketio.start_background_task(self._run)
+
+    def handle_ack(self, room, batch_id, origin):
+        if origin == self.origin:
+            self.acknowledge(room, batch_id)
+        elif self.forward_ack is not None:
+            self.forward_ack({'room': room, 'batch': batch_id, 'origin': origin})
+
+    def handle_forwarded_ack(self, data):
+        """Başka süreçten iletilen onay; yalnızca mesajı bu süreç gönderdiyse işlenir"""
+        if data.get('origin') == self.origin:
+            self.acknowledge(data['room'], data['batch'])
+
+    def acknowledge(self, room, batch_id):
+        """İstemcinin odada aldığı son toplu mesaj; aynı bağlantıda mesajlar sıralı geldiği
+        için odadaki öncekiler de alınmış sayılır"""
+        with self._lock:
+            in_flight = self._in_flight.get(room)
+            while in_flight and in_flight[0][0] <= batch_id:
+                in_flight.popleft()
+
+    def _ready_batches(self):
+        now = time.monotonic()
+        batches = []
+        with self._lock:
+            for room in list(self._pending):
+                in_flight = self._in_flight.setdefault(room, deque())
+                # Onaylanmayan mesajlar (ör. kapanmış sekme) odayı sonsuza dek bekletmesin
+                while in_flight and now - in_flight[0][1] > self.ack_timeout:
+                    in_flight.popleft()
+                if len(in_flight) >= self.max_in_flight:
+                    continue
+                sequence = self._sequences[room] = self._sequences.get(room, 0) + 1
+                batches.append((room, {
+                    'room': room,
+                    'batch': sequence,
+                    'origin': self.origin,
+                    'events': list(self._pending.pop(room)),
+                    'dropped': self._dropped.pop(room, 0)
+                }))
+                if self.track_acks:
+                    in_flight.append((sequence, now))
+            for room in [room for room, in_flight in self._in_flight.items()
+                         if not in_flight and room not in self._pending]:
+                del self._in_flight[room]
+        return batches
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.window)
+            try:
+                batches = self._ready_batches()
+            except Exception as e:
+                if self.app is not None:
+                    self.app.logger.error(f"Toplu bildirimler hazırlanırken hata: {str(e)}")
+                continue
+            for room, payload in batches:
+                try:
+                    socketio.emit('notification_batch', payload, room=room)
+                except Exception as e:
+                    if self.app is not None:
+                        self.app.logger.error(f"Toplu bildirim gönderilirken hata: {str(e)}")
+
+def _is_alive(task):
+    """Arka plan görevi (thread veya eventlet green thread) hâlâ çalışıyor mu"""
+    if task is None:
+        return False
+    is_alive = getattr(task, 'is_alive', None)
+    if is_alive is not None:
+        return is_alive()
+    return not getattr(task, 'dead', False)
+
+notification_batcher = NotificationBatcher()
+
 def init_app(app):
-    socketio.init_app(app, async_mode='eventlet', cors_allowed_origins="*")
+    """SocketIO'yu başlat; SOCKETIO_MESSAGE_QUEUE verilirse süreçler arası yayın kullanılır
+
+    local:///dizin aynı makinedeki süreçler için unix soketleri, redis://, kafka:// ve
+    amqp:// adresleri Flask-SocketIO'nun kendi yöneticileriyle kullanılır.
+    """
+    notification_batcher.init_app(app)
+    options = {}
+    queue = app.config.get('SOCKETIO_MESSAGE_QUEUE') or os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if queue:
+        manager = create_client_manager(queue)
+        if manager is not None:
+            options['client_manager'] = manager
+            manager.on_control('notification_ack', notification_batcher.handle_forwarded_ack)
+            notification_batcher.forward_ack = lambda data: manager.publish_control('notification_ack', data)
+        else:
+            options['message_queue'] = queue
+            notification_batcher.track_acks = False
+    socketio.init_app(app, async_mode='eventlet', cors_allowed_origins="*", **options)
+
+def _user_rooms(user):
+    rooms = [f'user_{user.id}']
+    if user.is_teacher:
+        rooms.append(f'teacher_{user.id}')
+    return rooms
+
+@socketio.on('join')
+def handle_join(data):
+    """Bağlanan kullanıcıyı kendi odasına (ve öğretmen ise kendi öğretmen odasına) ekle"""
+    if not current_user.is_authenticated:
+        return
+    for room in _user_rooms(current_user):
+        join_room(room)
+
+@socketio.on('notification_ack')
+def handle_notification_ack(data):
+    """İstemci toplu mesajı işledi; odaya yeni mesaj gönderilebilir"""
+    if not current_user.is_authenticated or not isinstance(data, dict):
+        return
+    try:
+        batch_id = int(data.get('batch'))
+    except (TypeError, ValueError):
+        return
+    # Kullanıcı yalnızca kendi odalarındaki mesajları onaylayabilir
+    room = data.get('room')
+    if room not in _user_rooms(current_user):
+        return
+    notification_batcher.handle_ack(room, batch_id, data.get('origin'))
 
 def emit_quiz_completion(attempt):
-    """Quiz tamamlama bildirimini gönder"""
+    """Quiz tamamlama bildirimini kuyruğa ekle; gönderim istek dışında toplu yapılır"""
     try:
+        student = attempt.student_profile
         notification_data = {
             'type': 'quiz_completion',
             'quiz_title': attempt.quiz.title,
             'score': round(attempt.score, 1),
-            'student_name': attempt.student.username,
+            'student_name': student.name if student else attempt.user.username,
             'timestamp': attempt.completed_at.strftime('%Y-%m-%d %H:%M:%S')
         }
-        
-        # Öğrenci quiz'i tamamladığında öğretmenlere bildirim gönder
-        if not attempt.student.is_teacher:
-            socketio.emit('notification', notification_data, room='teachers')
-            
-        # Quiz'i tamamlayan öğrenciye de bildirim gönder
-        socketio.emit('notification', notification_data, room=f'user_{attempt.student.id}')
-        
+
+        # Yalnızca öğrencinin kendi öğretmenine bildirim gönder
+        if student:
+            notification_batcher.enqueue(f'teacher_{student.teacher_id}', notification_data)
+
+        # Quiz'i tamamlayan kullanıcıya da bildirim gönder
+        notification_batcher.enqueue(f'user_{attempt.user_id}', notification_data)
+
     except Exception as e:
         current_app.logger.error(f"Quiz tamamlama bildirimi gönderilirken hata: {str(e)}")
+
+def emit_job_update(job):
+    """Arka plan işinin durum değişikliğini işin sahibine bildir"""
+    try:
+        socketio.emit('job_update', job.to_dict(), room=f'user_{job.owner_id}')
+    except Exception as e:
+        current_app.logger.error(f"İş durumu bildirimi gönderilirken hata: {str(e)}")
@@ -0,0 +1,25 @@
+import os
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+def query_count():
+    """Geçerli istekte şimdiye kadar çalıştırılan SQL ifadesi sayısı"""
+    return g.get('sql_query_count', 0)
+
+def init_app(app, db):
+    """İstek başına SQL ifadelerini say; N+1 gerilemelerini yakalamak için"""
+    event.listen(db.engine, 'before_cursor_execute', _count_statement)
+    threshold = int(app.config.get('SQL_QUERY_WARN_THRESHOLD') or os.environ.get('SQL_QUERY_WARN_THRESHOLD', 50))
+
+    @app.after_request
+    def report_query_count(response):
+        count = query_count()
+        if app.debug or app.testing:
+            response.headers['X-Query-Count'] = str(count)
+        if count > threshold:
+            app.logger.warning(f"Çok sayıda SQL sorgusu: {request.method} {request.path} ({count} sorgu)")
+        return response
@@ -0,0 +1,168 @@
+import os
+import random
+import threading
+from collections import defaultdict
+from flask import current_app
+from models import db, Curriculum, Quiz, Question, QuizAssignment, QuestionBankItem, QuizBankItem
+from ai_service import generate_quiz_questions, question_key, DIFFICULTY_LEVELS
+from ai_ratelimit import PRIORITY_BACKGROUND
+from jobs import job_queue
+import counters
+import grading
+
+_refilling = set()
+# Çalışan iş varken gelen istekler: müfredat kimliği -> sahibi; iş bitince bir kez daha çalıştırılır
+_pending_refills = {}
+_refilling_lock = threading.Lock()
+
+def _target_size():
+    return int(current_app.config.get('QUESTION_BANK_SIZE') or os.environ.get('QUESTION_BANK_SIZE', 40))
+
+def fresh_items(curriculum):
+    """Müfredatın güncel sürümüne ait soru bankası kayıtları"""
+    return QuestionBankItem.query.filter_by(
+        curriculum_id=curriculum.id,
+        curriculum_version=curriculum.updated_at
+    )
+
+def request_refill(curriculum_id, owner_id):
+    """Soru bankasını arka planda doldur; aynı müfredat için tek iş çalışır
+
+    İş sürerken gelen istekler atılmaz: çalışan iş müfredatın eski sürümü için soru üretiyor
+    olabilir. Bu istekler birleştirilir ve iş bittiğinde doldurma bir kez daha başlatılır.
+    """
+    with _refilling_lock:
+        if curriculum_id in _refilling:
+            _pending_refills[curriculum_id] = owner_id
+            return None
+        _refilling.add(curriculum_id)
+    try:
+        return job_queue.enqueue('question_bank', owner_id, curriculum_id=curriculum_id, owner_id=owner_id)
+    except Exception:
+        with _refilling_lock:
+            _refilling.discard(curriculum_id)
+        raise
+
+@job_queue.task('question_bank')
+def refill_question_bank(curriculum_id, owner_id):
+    """Eski sürüme ait soruları temizle ve bankayı hedef boyuta tamamla"""
+    try:
+        curriculum = db.session.get(Curriculum, curriculum_id)
+        if curriculum is None:
+            return {'curriculum_id': curriculum_id, 'added': 0}
+
+        # Hiçbir quizde kullanılmamış eski sürüm soruları sil
+        used_items = db.session.query(QuizBankItem.item_id)
+        QuestionBankItem.query.filter(
+            QuestionBankItem.curriculum_id == curriculum.id,
+            QuestionBankItem.curriculum_version != curriculum.updated_at,
+            QuestionBankItem.id.notin_(used_items)
+        ).delete(synchronize_session=False)
+
+        existing = fresh_items(curriculum).with_entities(QuestionBankItem.id, QuestionBankItem.question_text).all()
+        used = {item_id for (item_id,) in used_items.filter(QuizBankItem.item_id.in_([item_id for item_id, _ in existing]))}
+        seen = {question_key(text) for _, text in existing}
+        # Hedef, henüz hiçbir quizde kullanılmamış soru sayısıdır; banka kullanıldıkça büyür
+        missing = _target_size() - (len(existing) - len(used))
+        added = 0
+
+        if missing > 0:
+            version = curriculum.updated_at
+            # Önbellekteki yanıt bankadaki soruların aynısı olurdu; model mevcut soruları
+            # bilerek yeni sorular üretir
+            questions = generate_quiz_questions(curriculum.content, missing, use_cache=False,
+                                                owner_id=owner_id, priority=PRIORITY_BACKGROUND,
+                                                avoid=[text for _, text in existing])
+            for q_data in questions:
+                key = question_key(q_data['question'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                db.session.add(QuestionBankItem(
+                    curriculum_id=curriculum.id,
+                    question_text=q_data['question'],
+                    options=q_data['options'],
+                    correct_answer=q_data['correct_answer'],
+                    topic=q_data.get('topic'),
+                    difficulty=q_data.get('difficulty') or 'orta',
+                    curriculum_version=version
+                ))
+                added += 1
+
+        db.session.commit()
+        return {'curriculum_id': curriculum.id, 'title': curriculum.title, 'added': added}
+    finally:
+        with _refilling_lock:
+            _refilling.discard(curriculum_id)
+            pending_owner = _pending_refills.pop(curriculum_id, None)
+        if pending_owner is not None:
+            request_refill(curriculum_id, pending_owner)
+
+def _interleave(groups):
+    """Gruplardan sırayla birer eleman alarak tek liste oluştur"""
+    groups = [list(group) for group in groups if group]
+    result = []
+    while groups:
+        for group in groups:
+            result.append(group.pop(0))
+        groups = [group for group in groups if group]
+    return result
+
+def assemble_quiz(curriculum, num_questions, student_ids):
+    """Bankadan konu ve zorluk dengeli, öğrencilerin daha önce görmediği sorular seç
+
+    Yeterli soru yoksa None döner; çağıran AI üretimine geri düşer.
+    """
+    seen_items = db.session.query(QuizBankItem.item_id)\
+        .join(QuizAssignment, QuizAssignment.quiz_id == QuizBankItem.quiz_id)\
+        .filter(QuizAssignment.student_id.in_(student_ids))
+
+    candidates = fresh_items(curriculum)\
+        .filter(QuestionBankItem.id.notin_(seen_items))\
+        .all()
+    if len(candidates) < num_questions:
+        return None
+
+    # Zorluk -> konu -> sorular; her zorlukta konular dönüşümlü, zorluklar arasında da dönüşümlü seç
+    by_difficulty = defaultdict(lambda: defaultdict(list))
+    for item in candidates:
+        by_difficulty[item.difficulty or 'orta'][item.topic or ''].append(item)
+
+    lanes = []
+    for difficulty in DIFFICULTY_LEVELS + tuple(d for d in by_difficulty if d not in DIFFICULTY_LEVELS):
+        topics = list(by_difficulty.get(difficulty, {}).values())
+        for items in topics:
+            random.shuffle(items)
+        random.shuffle(topics)
+        lanes.append(_interleave(topics))
+
+    return _interleave(lanes)[:num_questions]
+
+def create_quiz_from_bank(title, curriculum, items, student_ids):
+    """Seçilen banka sorularından quiz oluştur ve öğrencilere ata"""
+    quiz = Quiz(
+        title=title,
+        curriculum_id=curriculum.id
+    )
+    db.session.add(quiz)
+    db.session.flush()
+
+    for item in items:
+        db.session.add(Question(
+            quiz_id=quiz.id,
+            question_text=item.question_text,
+            options=item.options,
+            correct_answer=item.correct_answer
+        ))
+        db.session.add(QuizBankItem(quiz_id=quiz.id, item_id=item.id))
+
+    for student_id in student_ids:
+        db.session.add(QuizAssignment(
+            quiz_id=quiz.id,
+            student_id=student_id
+        ))
+    counters.increment(curriculum.author_id, active_quizzes=len(student_ids))
+
+    db.session.commit()
+    grading.invalidate(quiz.id)
+    return quiz
@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required, current_user
 from models import Quiz, Question, QuizAttempt, Student, Curriculum, QuizAssignment, db
-from ai_service import generate_quiz_questions, AIServiceError
+from jobs import job_queue
+from question_bank import assemble_quiz, create_quiz_from_bank, request_refill
 from notifications import emit_quiz_completion
+from rollups import record_attempt
+import counters
+import grading
+import item_analysis
+import fragment_cache
 
 quiz_bp = Blueprint('quiz', __name__)
 
@@ -46,41 +52,33 @@ def create():
         
         try:
             current_app.logger.info(f"Quiz oluşturuluyor: {title}, Soru sayısı: {num_questions}")
-            questions_data = generate_quiz_questions(curriculum.content, num_questions)
+            student_ids = [int(student_id) for student_id in selected_students]
             
-            quiz = Quiz(
-                title=title,
-                curriculum_id=curriculum_id
-            )
-            db.session.add(quiz)
-            db.session.flush()
+            # Soru bankasında yeterli soru varsa quiz'i model çağırmadan oluştur
+            bank_items = assemble_quiz(curriculum, num_questions, student_ids)
+            if bank_items:
+                quiz = create_quiz_from_bank(title, curriculum, bank_items, student_ids)
+                current_app.logger.info(f"Quiz soru bankasından oluşturuldu: ID={quiz.id}")
+                request_refill(curriculum.id, current_user.id)
+                
+                if request.accept_mimetypes.best == 'application/json':
+                    return jsonify({'quiz_id': quiz.id}), 201
+                
+                flash('Quiz başarıyla oluşturuldu ve seçilen öğrencilere atandı!', 'success')
+                return redirect(url_for('curriculum.view', id=curriculum.id))
             
-            for q_data in questions_data:
-                question = Question(
-                    quiz_id=quiz.id,
-                    question_text=q_data['question'],
-                    options=q_data['options'],
-                    correct_answer=q_data['correct_answer']
-                )
-                db.session.add(question)
+            job = job_queue.enqueue('quiz', current_user.id,
+                                    author_id=current_user.id,
+                                    title=title,
+                                    curriculum_id=curriculum.id,
+                                    num_questions=num_questions,
+                                    student_ids=student_ids)
             
-            # Create quiz assignments for selected students
-            for student_id in selected_students:
-                assignment = QuizAssignment(
-                    quiz_id=quiz.id,
-                    student_id=int(student_id)
-                )
-                db.session.add(assignment)
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'job_id': job.id, 'status_url': url_for('jobs.status', job_id=job.id)}), 202
             
-            db.session.commit()
-            current_app.logger.info(f"Quiz başarıyla oluşturuldu: ID={quiz.id}")
-            flash('Quiz başarıyla oluşturuldu ve seçilen öğrencilere atandı!', 'success')
-            return redirect(url_for('curriculum.view', id=curriculum_id))
-            
-        except AIServiceError as e:
-            current_app.logger.error(f"AI Servisi Hatası: {str(e)}")
-            flash(f'Quiz oluşturulurken hata: {str(e)}', 'error')
-            return render_template('quiz/create.html', curricula=curricula, students=students)
+            flash('Quiz arka planda oluşturuluyor. Hazır olduğunda seçilen öğrencilere atanacak.', 'info')
+            return redirect(url_for('curriculum.view', id=curriculum.id))
             
         except Exception as e:
             current_app.logger.error(f"Quiz oluşturma hatası: {str(e)}")
@@ -107,17 +105,30 @@ def take(id):
         ).first_or_404()
     
     if request.method == 'POST':
-        score = 0
-        total_questions = len(quiz.questions)
-        
-        for question in quiz.questions:
-            answer = request.form.get(f'question_{question.id}')
-            if answer == question.correct_answer:
-                score += 1
-        
-        final_score = (score / total_questions) * 100
+        # Önbellekteki cevap anahtarıyla notlandır; sorular veritabanından yüklenmez
+        key = grading.answer_key(quiz.id)
+        result = key.grade(request.form)
+        final_score = result.score
         
         try:
+            # Koşullu güncelleme: atamayı ilk tamamlayan istek kaydeder; yinelenen veya
+            # eşzamanlı gönderim hiçbir özete eklenmeden önceki sonuca yönlendirilir
+            if student and assignment:
+                marked = QuizAssignment.query\
+                    .filter_by(id=assignment.id, completed=False)\
+                    .update({QuizAssignment.completed: True}, synchronize_session=False)
+                if not marked:
+                    db.session.rollback()
+                    existing = QuizAttempt.query\
+                        .filter_by(quiz_id=quiz.id, student_id=student.id)\
+                        .order_by(QuizAttempt.completed_at.desc())\
+                        .first()
+                    flash('Bu quiz zaten tamamlandı.', 'info')
+                    if existing:
+                        return redirect(url_for('quiz.results', attempt_id=existing.id))
+                    return redirect(url_for('dashboard.index'))
+                counters.increment(student.teacher_id, active_quizzes=-1, completed_quizzes=1)
+            
             # Create quiz attempt with proper student relationship
             attempt = QuizAttempt(
                 user_id=current_user.id,
@@ -125,11 +136,15 @@ def take(id):
                 student_id=student.id if student else None,  # Set student_id correctly
                 score=final_score,
             )
+            # Soru bazında cevaplar denemeyle aynı flush'ta yazılır
+            attempt.response = result.to_response()
             db.session.add(attempt)
             
-            # Mark the assignment as completed if student exists
-            if student and assignment:
-                assignment.completed = True
+            # Özet tablolarını aynı işlem içinde güncelle
+            if student:
+                db.session.flush()
+                record_attempt(attempt, student.teacher_id, quiz.curriculum_id)
+                item_analysis.record_response(key, result)
             
             db.session.commit()
             
@@ -145,7 +160,8 @@ def take(id):
             flash('Quiz sonucu kaydedilirken bir hata oluştu.', 'error')
             return redirect(url_for('dashboard.index'))
     
-    return render_template('quiz/take.html', quiz=quiz)
+    # Soru formu önbellekteki parçadan gelir; sorular her görüntülemede yüklenmez
+    return render_template('quiz/take.html', quiz=quiz, questions_html=fragment_cache.quiz_questions(quiz))
 
 @quiz_bp.route('/quiz/results/<int:attempt_id>')
 @login_required
@@ -164,4 +180,6 @@ def results(attempt_id):
             flash('Bu öğrencinin sonuçlarını görüntüleme yetkiniz yok.', 'error')
             return redirect(url_for('dashboard.index'))
     
-    return render_template('quiz/results.html', attempt=attempt)
+    answers = grading.answer_key(attempt.quiz_id).decode(attempt.response)
+    item_stats = item_analysis.quiz_item_analysis(attempt.quiz_id) if current_user.is_teacher else {}
+    return render_template('quiz/results.html', attempt=attempt, answers=answers, item_stats=item_stats)
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from ai_cache import MemoryCache
+from models import QuizAttempt, Quiz, Student
+from analytics_queries import attempts_query
+import rollups
+
+BY_TEACHER = 'teacher'
+BY_GRADE = 'grade'
+BY_CURRICULUM = 'curriculum'
+
+_rankings = None
+
+def _cache():
+    global _rankings
+    if _rankings is None:
+        _rankings = MemoryCache(
+            max_entries=int(current_app.config.get('RANKING_CACHE_SIZE') or os.environ.get('RANKING_CACHE_SIZE', 256)),
+            ttl=int(current_app.config.get('RANKING_CACHE_TTL') or os.environ.get('RANKING_CACHE_TTL', 3600))
+        )
+    return _rankings
+
+class Ranking:
+    """Öğrenci ortalamalarının sıralı dizisi
+
+    Ortalamalar bir kez sıralanır; her öğrencinin sırası ve yüzdelik dilimi ikili arama ile
+    O(log n) sürede bulunur. Yüzdelik dilim SQL percent_rank() ile aynı tanımı kullanır:
+    kendisinden düşük ortalamaya sahip öğrenci sayısı / (öğrenci sayısı - 1).
+    """
+
+    __slots__ = ('averages', 'sorted_averages')
+
+    def __init__(self, averages):
+        self.averages = averages
+        self.sorted_averages = np.sort(np.fromiter(averages.values(), dtype=np.float64, count=len(averages)))
+
+    def __len__(self):
+        return len(self.averages)
+
+    def __contains__(self, student_id):
+        return student_id in self.averages
+
+    def percent_rank(self, average):
+        if len(self) < 2:
+            return 0.0
+        below = int(np.searchsorted(self.sorted_averages, average, side='left'))
+        return below / (len(self) - 1) * 100
+
+    def rank(self, average):
+        """1 en yüksek ortalamadır; eşit ortalamalar aynı sırayı alır"""
+        return len(self) - int(np.searchsorted(self.sorted_averages, average, side='right')) + 1
+
+    def percentiles(self):
+        """Tüm öğrencilerin yüzdelik dilimlerini tek vektörel aramayla hesapla"""
+        student_ids = list(self.averages)
+        values = np.fromiter(self.averages.values(), dtype=np.float64, count=len(self.averages))
+        below = np.searchsorted(self.sorted_averages, values, side='left')
+        percentiles = below / max(len(self) - 1, 1) * 100
+        return dict(zip(student_ids, percentiles.tolist()))
+
+    def position(self, student_id):
+        """Öğrencinin sıralamadaki yeri; hiç denemesi yoksa None"""
+        average = self.averages.get(student_id)
+        if average is None:
+            return None
+        return {
+            'average': average,
+            'rank': self.rank(average),
+            'size': len(self),
+            'percentile': self.percent_rank(average)
+        }
+
+def _build(by, teacher_id):
+    """Öğrenci ortalamalarını veritabanında GROUP BY ile hesaplayıp sıralamaları oluştur"""
+    key_column = {BY_GRADE: Student.grade, BY_CURRICULUM: Quiz.curriculum_id}.get(by)
+    columns = [QuizAttempt.student_id, func.avg(QuizAttempt.score)]
+    if key_column is not None:
+        columns.insert(0, key_column)
+    query = attempts_query(*columns, teacher_id=teacher_id).filter(QuizAttempt.score.isnot(None))
+    if key_column is not None:
+        query = query.group_by(key_column, QuizAttempt.student_id)
+    else:
+        query = query.group_by(QuizAttempt.student_id)
+    rows = query.all()
+
+    if key_column is None:
+        return Ranking({student_id: float(average) for student_id, average in rows})
+    grouped = {}
+    for key, student_id, average in rows:
+        grouped.setdefault(key, {})[student_id] = float(average)
+    return {key: Ranking(averages) for key, averages in grouped.items()}
+
+def rankings(teacher_id, by=BY_TEACHER):
+    """Öğretmenin öğrencileri için sıralama
+
+    by=BY_TEACHER tek bir Ranking döndürür; BY_GRADE ve BY_CURRICULUM sınıf seviyesinden
+    veya müfredat kimliğinden Ranking'e eşleme döndürür. Sonuç yeni bir deneme
+    kaydedilene kadar bellekte tutulur.
+    """
+    key = f"{teacher_id}:{by}"
+    version = rollups.data_version(rollups.SCOPE_TEACHER, teacher_id)
+    cached = _cache().get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    result = _build(by, teacher_id)
+    _cache().set(key, (version, result))
+    return result
@@ -0,0 +1,192 @@
+import glob
+import hashlib
+import os
+import re
+import threading
+from flask import current_app
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from models import db, QuizAttempt, Quiz, Curriculum, Student
+from score_stats import ScoreStats
+from jobs import job_queue
+import rollups
+
+# Büyük tablolar bu kadar satırlık parçalara bölünür; tek dev tablonun sayfalara
+# bölünmesi ReportLab'de hem yavaş hem de bellek açısından pahalıdır
+TABLE_CHUNK_ROWS = 250
+FETCH_BATCH_SIZE = 1000
+
+_pending = {}
+_pending_lock = threading.Lock()
+
+STATS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+ATTEMPTS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+ATTEMPTS_HEADER = ['Öğrenci', 'Quiz', 'Müfredat', 'Puan', 'Tarih']
+
+def _cache_dir():
+    path = current_app.config.get('REPORT_CACHE_DIR') or os.environ.get('REPORT_CACHE_DIR') \
+        or os.path.join(current_app.instance_path, 'reports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def data_version(owner_id, student_id):
+    """Rapor verisinin sürümü; yeni bir deneme kaydedildiğinde değişir"""
+    if student_id is not None:
+        return rollups.data_version(rollups.SCOPE_STUDENT, student_id)
+    return rollups.data_version(rollups.SCOPE_TEACHER, owner_id)
+
+def _prefix(owner_id, student_id):
+    return f"report_{owner_id}_{student_id if student_id is not None else 'class'}_"
+
+def artifact_name(owner_id, student_id, version):
+    digest = hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]
+    return f"{_prefix(owner_id, student_id)}{digest}.pdf"
+
+def artifact_path(name):
+    """Kullanıcının verdiği ad yalnızca beklenen biçimdeyse önbellek yoluna çevrilir"""
+    if not re.fullmatch(r'report_\d+_(\d+|class)_[0-9a-f]{16}\.pdf', name):
+        return None
+    return os.path.join(_cache_dir(), name)
+
+def artifact_owner(name):
+    match = re.fullmatch(r'report_(\d+)_(\d+|class)_[0-9a-f]{16}\.pdf', name)
+    if not match:
+        return None, None
+    student = match.group(2)
+    return int(match.group(1)), (None if student == 'class' else int(student))
+
+def cached_report(owner_id, student_id):
+    """Verinin güncel sürümü için oluşturulmuş PDF varsa yolunu döndür"""
+    path = os.path.join(_cache_dir(), artifact_name(owner_id, student_id, data_version(owner_id, student_id)))
+    return path if os.path.exists(path) else None
+
+def request_report(owner_id, student_id, title):
+    """Raporu arka planda oluşturmak için iş kuyruğa ekle; aynı rapor için tek iş çalışır"""
+    version = data_version(owner_id, student_id)
+    key = artifact_name(owner_id, student_id, version)
+    with _pending_lock:
+        for finished in [k for k, pending in _pending.items() if pending.done]:
+            del _pending[finished]
+        job = _pending.get(key)
+        if job is not None and not job.done:
+            return job
+        job = job_queue.enqueue('pdf_report', owner_id, owner_id=owner_id, student_id=student_id,
+                                title=title, version=version)
+        _pending[key] = job
+        return job
+
+def _attempt_rows(owner_id, student_id):
+    query = db.session.query(
+        Student.name,
+        Quiz.title,
+        Curriculum.title,
+        QuizAttempt.score,
+        QuizAttempt.completed_at
+    ).select_from(QuizAttempt)\
+        .join(Quiz, QuizAttempt.quiz_id == Quiz.id)\
+        .join(Curriculum, Quiz.curriculum_id == Curriculum.id)\
+        .join(Student, QuizAttempt.student_id == Student.id)
+    if student_id is not None:
+        query = query.filter(QuizAttempt.student_id == student_id)
+    else:
+        query = query.filter(Student.teacher_id == owner_id)
+    return query.order_by(QuizAttempt.completed_at.desc()).yield_per(FETCH_BATCH_SIZE)
+
+def _attempts_table(rows):
+    table = Table([ATTEMPTS_HEADER] + rows, colWidths=[100, 100, 100, 70, 100], repeatRows=1)
+    table.setStyle(ATTEMPTS_STYLE)
+    return table
+
+def render_report(path, owner_id, student_id, title):
+    """PDF'i oluştur; istatistikler aynı geçişte ScoreStats ile toplanır"""
+    styles = getSampleStyleSheet()
+    custom_style = ParagraphStyle(
+        'CustomStyle',
+        parent=styles['Normal'],
+        fontSize=12,
+        leading=16
+    )
+
+    stats = ScoreStats()
+    tables = []
+    chunk = []
+    for student_name, quiz_title, curriculum_title, score, completed_at in _attempt_rows(owner_id, student_id):
+        stats.add(score)
+        chunk.append([
+            student_name,
+            quiz_title,
+            curriculum_title,
+            f"{score:.1f}%" if score is not None else '',
+            completed_at.strftime('%Y-%m-%d %H:%M') if completed_at else ''
+        ])
+        if len(chunk) == TABLE_CHUNK_ROWS:
+            tables.append(_attempts_table(chunk))
+            chunk = []
+    if chunk:
+        tables.append(_attempts_table(chunk))
+
+    elements = [Paragraph(title, styles['Title']), Spacer(1, 20)]
+    if tables:
+        stats_table = Table([
+            ['İstatistik', 'Değer'],
+            ['Ortalama Puan', f'{stats.mean:.1f}%'],
+            ['Medyan Puan', f'{stats.median:.1f}%'],
+            ['Standart Sapma', f'{stats.std_dev:.1f}'],
+            ['Quiz Sayısı', str(stats.count)]
+        ], colWidths=[200, 200])
+        stats_table.setStyle(STATS_STYLE)
+        elements += [stats_table, Spacer(1, 20)] + tables
+    else:
+        elements.append(Paragraph("Henüz quiz denemesi bulunmuyor.", custom_style))
+
+    # Yarım kalmış dosya sunulmasın diye önce geçici dosyaya yaz
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    SimpleDocTemplate(temp_path, pagesize=letter).build(elements)
+    os.replace(temp_path, path)
+
+def _prune(owner_id, student_id, keep):
+    """Aynı raporun eski sürümlerini sil"""
+    for old_path in glob.glob(os.path.join(_cache_dir(), f"{_prefix(owner_id, student_id)}*.pdf")):
+        if old_path != keep:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+@job_queue.task('pdf_report')
+def generate_pdf_report(owner_id, student_id, title, version):
+    """Performans raporunu oluştur ve önbelleğe kaydet"""
+    name = artifact_name(owner_id, student_id, version)
+    path = os.path.join(_cache_dir(), name)
+    if not os.path.exists(path):
+        render_report(path, owner_id, student_id, title)
+        _prune(owner_id, student_id, keep=path)
+    return {'report': name, 'title': title}
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+import click
+from sqlalchemy.exc import IntegrityError
+from models import db, ScoreRollup, QuizAttempt, Quiz, Student
+from score_stats import ScoreStats
+
+SCOPE_STUDENT = 'student'
+SCOPE_CURRICULUM = 'curriculum'
+SCOPE_TEACHER = 'teacher'
+PERIOD_ALL = 'all'
+
+def day_period(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def _apply(rollup, score, completed_at):
+    """Tek bir puanı özet satırına ekle"""
+    if not rollup.count:
+        rollup.first_score = score
+    rollup.count = (rollup.count or 0) + 1
+    rollup.total = (rollup.total or 0) + score
+    rollup.sum_squares = (rollup.sum_squares or 0) + score * score
+    rollup.min_score = score if rollup.min_score is None else min(rollup.min_score, score)
+    rollup.max_score = score if rollup.max_score is None else max(rollup.max_score, score)
+    if rollup.last_at is None or completed_at >= rollup.last_at:
+        rollup.last_score = score
+        rollup.last_at = completed_at
+    # JSON sütununun değiştiği algılansın diye yeni sözlük ata
+    histogram = dict(rollup.histogram or {})
+    bucket = str(ScoreStats.bin_of(score))
+    histogram[bucket] = histogram.get(bucket, 0) + 1
+    rollup.histogram = histogram
+
+def _locked_rollup(scope, scope_id, period):
+    """Özet satırını kilitleyerek getir; yoksa oluştur"""
+    query = ScoreRollup.query.filter_by(scope=scope, scope_id=scope_id, period=period).with_for_update()
+    rollup = query.first()
+    if rollup is None:
+        try:
+            with db.session.begin_nested():
+                rollup = ScoreRollup(scope=scope, scope_id=scope_id, period=period,
+                                     count=0, total=0, sum_squares=0, histogram={})
+                db.session.add(rollup)
+        except IntegrityError:
+            # Eşzamanlı bir istek satırı önce oluşturdu
+            rollup = query.first()
+    return rollup
+
+def record_attempt(attempt, teacher_id, curriculum_id):
+    """Kaydedilen denemeyi öğrenci, müfredat ve öğretmen özetlerine ekle
+
+    Çağıranın işlemi (transaction) içinde çalışır; satırlar kilitlenme sırası hep aynı
+    olacak şekilde güncellenir ki eşzamanlı denemeler birbirini kilitlemesin.
+    """
+    if attempt.student_id is None or attempt.score is None:
+        return
+    completed_at = attempt.completed_at or datetime.utcnow()
+    day = day_period(completed_at)
+    for scope, scope_id in ((SCOPE_STUDENT, attempt.student_id),
+                            (SCOPE_CURRICULUM, curriculum_id),
+                            (SCOPE_TEACHER, teacher_id)):
+        for period in (PERIOD_ALL, day):
+            _apply(_locked_rollup(scope, scope_id, period), attempt.score, completed_at)
+
+def get_rollup(scope, scope_id):
+    return ScoreRollup.query.filter_by(scope=scope, scope_id=scope_id, period=PERIOD_ALL).first()
+
+def data_version(scope, scope_id):
+    """Kapsamın verisinin sürümü; yeni bir deneme kaydedildiğinde değişir"""
+    rollup = get_rollup(scope, scope_id)
+    if rollup is None or not rollup.count:
+        return 'empty'
+    return f"{rollup.count}-{rollup.last_at:%Y%m%d%H%M%S%f}"
+
+def daily_rollups(scope, scope_ids, days=None):
+    """Günlük özet satırları (eskiden yeniye); days verilirse yalnızca son günler"""
+    if not scope_ids:
+        return {}
+    query = ScoreRollup.query.filter(
+        ScoreRollup.scope == scope,
+        ScoreRollup.scope_id.in_(scope_ids),
+        ScoreRollup.period != PERIOD_ALL
+    )
+    if days is not None:
+        query = query.filter(ScoreRollup.period >= day_period(datetime.utcnow() - timedelta(days=days)))
+    results = {}
+    for row in query.order_by(ScoreRollup.period).all():
+        results.setdefault(row.scope_id, []).append(row)
+    return results
+
+def rollup_stats(rollup):
+    """Özet satırından birleştirilebilir ScoreStats toplayıcısı oluştur"""
+    if rollup is None:
+        return ScoreStats()
+    return ScoreStats.from_moments(rollup.count, rollup.total, rollup.sum_squares,
+                                   rollup.min_score, rollup.max_score, rollup.histogram)
+
+def summarize_rollup(rollup, recent=()):
+    """Özet satırını analiz sayfasının kullandığı özet biçimine çevir
+
+    Medyan ve çeyrekler tam puana yuvarlanmış histogramdan hesaplanır.
+    recent, son günlerin günlük özet satırlarıdır.
+    """
+    if rollup is None or not rollup.count:
+        return None
+    summary = rollup_stats(rollup).summary()
+    recent_stats = ScoreStats()
+    for row in recent:
+        recent_stats.merge(rollup_stats(row))
+    return {
+        'attempts': summary['count'],
+        'scored': summary['count'],
+        'total_score': summary['total'],
+        'average': summary['average'],
+        'median': summary['median'],
+        'std_dev': summary['std_dev'],
+        'quartiles': summary['quartiles'],
+        'highest': summary['highest'],
+        'lowest': summary['lowest'],
+        'first_score': rollup.first_score,
+        'last_score': rollup.last_score,
+        'recent_attempts': recent_stats.count,
+        'recent_average': recent_stats.mean,
+    }
+
+def summary_for(scope, scope_id, recent_days=7):
+    """Tek kapsamın özeti: tüm zamanlar satırı ve son günlerin satırları"""
+    rollup = get_rollup(scope, scope_id)
+    recent = daily_rollups(scope, [scope_id], days=recent_days).get(scope_id, []) if rollup else []
+    return summarize_rollup(rollup, recent)
+
+def rebuild():
+    """Tüm özet tablolarını QuizAttempt kayıtlarından tek geçişte yeniden oluştur
+
+    Denemeler tarih sırasıyla parça parça okunur; bellekte yalnızca özet satırları tutulur.
+    Yeni denemelerin kaybolmaması için yoğun olmayan bir zamanda çalıştırılmalıdır.
+    """
+    rollups = {}
+    attempts = db.session.query(
+        QuizAttempt.student_id,
+        Student.teacher_id,
+        Quiz.curriculum_id,
+        QuizAttempt.score,
+        QuizAttempt.completed_at
+    ).join(Student, QuizAttempt.student_id == Student.id)\
+        .join(Quiz, QuizAttempt.quiz_id == Quiz.id)\
+        .filter(QuizAttempt.score.isnot(None))\
+        .order_by(QuizAttempt.completed_at, QuizAttempt.id)\
+        .yield_per(5000)
+
+    for student_id, teacher_id, curriculum_id, score, completed_at in attempts:
+        completed_at = completed_at or datetime.utcnow()
+        day = day_period(completed_at)
+        for scope, scope_id in ((SCOPE_STUDENT, student_id),
+                                (SCOPE_CURRICULUM, curriculum_id),
+                                (SCOPE_TEACHER, teacher_id)):
+            for period in (PERIOD_ALL, day):
+                key = (scope, scope_id, period)
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = ScoreRollup(scope=scope, scope_id=scope_id, period=period,
+                                                        count=0, total=0, sum_squares=0, histogram={})
+                _apply(rollup, score, completed_at)
+
+    ScoreRollup.query.delete(synchronize_session=False)
+    db.session.add_all(rollups.values())
+    db.session.commit()
+    return len(rollups)
+
+def init_app(app):
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Puan özet tablolarını mevcut quiz denemelerinden yeniden oluştur"""
+        count = rebuild()
+        click.echo(f"{count} özet satırı oluşturuldu")
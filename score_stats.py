@@ -0,0 +1,130 @@
+MIN_SCORE = 0
+MAX_SCORE = 100
+BIN_COUNT = MAX_SCORE - MIN_SCORE + 1
+
+class ScoreStats:
+    """Puanlar için tek geçişli, birleştirilebilir istatistik toplayıcı
+
+    Ortalama ve varyans Welford yöntemiyle, medyan ve çeyrekler 0-100 aralığında tam
+    puanlık sabit bir histogramdan hesaplanır. Bellek kullanımı puan sayısından
+    bağımsızdır ve iki toplayıcı merge() ile birleştirilebilir (sınıf = öğrenciler toplamı).
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * BIN_COUNT
+
+    @staticmethod
+    def bin_of(score):
+        return min(MAX_SCORE, max(MIN_SCORE, int(round(score)))) - MIN_SCORE
+
+    def add(self, score):
+        if score is None:
+            return self
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        self.histogram[self.bin_of(score)] += 1
+        return self
+
+    def merge(self, other):
+        """Başka bir toplayıcıyı bu toplayıcıya ekle (paralel Welford birleştirmesi)"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            self.histogram = list(other.histogram)
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        return self
+
+    @classmethod
+    def from_moments(cls, count, total, sum_squares, min_score=None, max_score=None, histogram=None):
+        """Toplam ve kareler toplamından (ör. özet tablosu satırı) toplayıcı oluştur"""
+        stats = cls()
+        if not count:
+            return stats
+        stats.count = count
+        stats.mean = total / count
+        stats.m2 = max(sum_squares - total * total / count, 0.0)
+        stats.min = min_score
+        stats.max = max_score
+        if histogram:
+            stats.histogram = cls.histogram_from_dict(histogram)
+        return stats
+
+    @staticmethod
+    def histogram_from_dict(data):
+        histogram = [0] * BIN_COUNT
+        for bucket, occurrences in (data or {}).items():
+            histogram[ScoreStats.bin_of(float(bucket))] += occurrences
+        return histogram
+
+    @property
+    def total(self):
+        return self.mean * self.count
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std_dev(self):
+        return self.variance ** 0.5
+
+    def _value_at(self, rank):
+        seen = 0
+        for index, occurrences in enumerate(self.histogram):
+            seen += occurrences
+            if rank < seen:
+                return index + MIN_SCORE
+        return MAX_SCORE
+
+    def quantile(self, q):
+        """percentile_cont ile aynı doğrusal ara değerli yüzdelik (tam puana yuvarlanmış veriden)"""
+        binned = sum(self.histogram)
+        if not binned:
+            return 0.0
+        position = q * (binned - 1)
+        lower = int(position)
+        low = self._value_at(lower)
+        high = self._value_at(min(lower + 1, binned - 1))
+        return float(low + (high - low) * (position - lower))
+
+    def quantiles(self, qs=(0.25, 0.5, 0.75)):
+        return [self.quantile(q) for q in qs]
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+    def summary(self):
+        """Tüm metrikleri tek sözlükte döndür"""
+        quartiles = self.quantiles()
+        return {
+            'count': self.count,
+            'total': self.total,
+            'average': self.mean if self.count else 0.0,
+            'median': quartiles[1],
+            'std_dev': self.std_dev,
+            'quartiles': quartiles,
+            'highest': self.max if self.max is not None else 0.0,
+            'lowest': self.min if self.min is not None else 0.0,
+        }
@@ -0,0 +1,148 @@
+import glob
+import os
+import pickle
+import socket
+import uuid
+from urllib.parse import urlparse
+import socketio
+
+# Unix datagram soketlerinde tek mesajın üst sınırı; daha büyük bildirimler gönderilemez
+MAX_DATAGRAM = 208 * 1024
+SEND_TIMEOUT = 1.0
+
+class LocalSocketBus:
+    """Aynı makinedeki süreçler arasında unix datagram soketleriyle yayın
+
+    Dinleyen her süreç dizinde kendi soketini açar; yayın dizindeki diğer tüm soketlere
+    gönderilir. Kapanmış süreçlerden kalan soket dosyaları ilk gönderimde silinir. Alıcının
+    kuyruğu doluysa gönderen en fazla SEND_TIMEOUT saniye bekler, sonra mesaj o alıcı için
+    atılır.
+    """
+
+    def __init__(self, directory, channel='socketio', socket_module=socket):
+        self.directory = directory
+        self.channel = channel
+        self.socket_module = socket_module
+        self.path = None
+        self._receiver = None
+        self._sender = None
+        # Mesajlar pickle ile taşındığı için dizine yalnızca uygulamanın kullanıcısı yazabilmeli
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _peers(self):
+        return [path for path in glob.glob(os.path.join(self.directory, f"{self.channel}-*.sock"))
+                if path != self.path]
+
+    def open(self):
+        """Bu süreç için dinleme soketini oluştur"""
+        self.path = os.path.join(self.directory, f"{self.channel}-{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._receiver = self.socket_module.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * MAX_DATAGRAM)
+        self._receiver.bind(self.path)
+        return self
+
+    def publish(self, payload):
+        """Mesajı diğer tüm dinleyicilere gönder; ulaşılan dinleyici sayısını döndür"""
+        if len(payload) > MAX_DATAGRAM:
+            raise ValueError(f"Mesaj çok büyük ({len(payload)} bayt)")
+        if self._sender is None:
+            self._sender = self.socket_module.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.settimeout(SEND_TIMEOUT)
+        delivered = 0
+        for path in self._peers():
+            try:
+                self._sender.sendto(payload, path)
+                delivered += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Dinleyicisi kalmamış soket dosyası
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except (socket.timeout, BlockingIOError):
+                pass
+        return delivered
+
+    def receive(self):
+        while True:
+            yield self._receiver.recv(MAX_DATAGRAM)
+
+    def close(self):
+        """Soketleri kapat; sonraki publish() yeni bir gönderici soketi, open() yeni bir alıcı açar"""
+        for sock in (self._receiver, self._sender):
+            if sock is not None:
+                sock.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self._receiver = None
+        self._sender = None
+        self.path = None
+
+class LocalSocketManager(socketio.PubSubManager):
+    """Socket.IO için tek makinede çok süreçli yayın yöneticisi (local:///dizin)
+
+    Redis gibi harici bir kuyruk gerektirmez; testler ve tek sunucuda birden çok işçi
+    süreci için uygundur. Socket.IO mesajlarının yanında uygulamanın kendi denetim
+    mesajlarını da (ör. bildirim onayları) taşır.
+    """
+
+    name = 'local'
+
+    def __init__(self, url='local:///tmp/socketio-bus', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.directory = urlparse(url).path
+        self.bus = None
+        self._control_handlers = {}
+
+    def _bus(self):
+        if self.bus is None:
+            socket_module = socket
+            if self.server is not None and self.server.async_mode == 'eventlet':
+                from eventlet.green import socket as socket_module
+            self.bus = LocalSocketBus(self.directory, self.channel, socket_module)
+        return self.bus
+
+    def on_control(self, kind, handler):
+        self._control_handlers[kind] = handler
+
+    def publish_control(self, kind, data):
+        """Diğer süreçlere uygulama denetim mesajı gönder"""
+        self._publish({'method': 'control', 'kind': kind, 'data': data, 'host_id': self.host_id})
+
+    def _publish(self, data):
+        try:
+            return self._bus().publish(pickle.dumps(data))
+        except Exception as e:
+            self._get_logger().error(f"Yerel yayın hatası: {str(e)}")
+
+    def _listen(self):
+        bus = self._bus().open()
+        try:
+            for message in bus.receive():
+                # Bozuk bir mesaj veya hatalı bir denetim işleyicisi dinlemeyi sonlandırmamalı
+                try:
+                    data = pickle.loads(message)
+                    if isinstance(data, dict) and data.get('method') == 'control':
+                        handler = self._control_handlers.get(data.get('kind'))
+                        if handler is not None:
+                            handler(data['data'])
+                        continue
+                except Exception as e:
+                    self._get_logger().error(f"Yerel yayın mesajı işlenemedi: {str(e)}")
+                    continue
+                yield data
+        finally:
+            bus.close()
+
+def create_client_manager(url, channel='socketio', write_only=False):
+    """SOCKETIO_MESSAGE_QUEUE adresine göre yayın yöneticisi
+
+    local:// için LocalSocketManager döner. Redis, Kafka ve AMQP adresleri için None döner;
+    bunları Flask-SocketIO message_queue parametresiyle kendisi kurar.
+    """
+    if urlparse(url).scheme == 'local':
+        return LocalSocketManager(url, channel=channel, write_only=write_only)
+    return None
@@ -67,6 +67,58 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
 
+        // Yanıtlar URL'ye göre saklanır; tekrar seçilen dönem anında çizilir ve
+        // arka planda ETag ile doğrulanır (değişmediyse sunucu 304 döner)
+        const trendCache = new Map();
+        
+        const renderTrend = (points) => {
+            const scores = points.map(item => item.score);
+            const movingAverages = scores.map((_, index) => {
+                const slice = scores.slice(Math.max(0, index - 2), index + 1);
+                return slice.reduce((a, b) => a + b, 0) / slice.length;
+            });
+            
+            trendsChart.data.labels = points.map(item => item.date);
+            trendsChart.data.datasets[0].data = scores;
+            trendsChart.data.datasets[1].data = movingAverages;
+            trendsChart.update();
+        };
+        
+        const fetchTrend = (params, points = []) => {
+            return fetch(`/analytics/performance_trends?${params}`, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.json())
+                .then(data => {
+                    const page = points.concat(data[params.get('period')] || []);
+                    // İmleç ilerlemiyorsa aynı sayfayı tekrar istemeyi bırak
+                    if (!data.next_cursor || data.next_cursor === params.get('cursor')) {
+                        return page;
+                    }
+                    const nextParams = new URLSearchParams(params);
+                    nextParams.set('cursor', data.next_cursor);
+                    return fetchTrend(nextParams, page);
+                });
+        };
+        
+        const loadTrend = (period) => {
+            const params = new URLSearchParams({ period });
+            const studentId = studentSelect?.value || '';
+            if (studentId) {
+                params.append('student_id', studentId);
+            }
+            const key = params.toString();
+            if (trendCache.has(key)) {
+                renderTrend(trendCache.get(key));
+            }
+            fetchTrend(params)
+                .then(points => {
+                    trendCache.set(key, points);
+                    renderTrend(points);
+                })
+                .catch(error => {
+                    console.error('Error fetching performance trends:', error);
+                });
+        };
+        
         // Handle period selection for trends if buttons exist
         if (periodButtons && periodButtons.length > 0) {
             periodButtons.forEach(button => {
@@ -79,31 +131,10 @@ document.addEventListener('DOMContentLoaded', function() {
                         });
                         this.classList.add('active');
                         
-                        const studentId = studentSelect?.value || '';
                         const period = this.dataset.period;
-                        
                         if (!period) return;
                         
-                        fetch(`/analytics/performance_trends?period=${period}&student_id=${studentId}`)
-                            .then(response => response.json())
-                            .then(data => {
-                                if (data[period]) {
-                                    // Calculate moving average for the new data
-                                    const scores = data[period].map(item => item.score);
-                                    const movingAverages = scores.map((_, index) => {
-                                        const slice = scores.slice(Math.max(0, index - 2), index + 1);
-                                        return slice.reduce((a, b) => a + b, 0) / slice.length;
-                                    });
-
-                                    trendsChart.data.labels = data[period].map(item => item.date);
-                                    trendsChart.data.datasets[0].data = scores;
-                                    trendsChart.data.datasets[1].data = movingAverages;
-                                    trendsChart.update();
-                                }
-                            })
-                            .catch(error => {
-                                console.error('Error fetching performance trends:', error);
-                            });
+                        loadTrend(period);
                     });
                 }
             });
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from models import db, Student, QuizAttempt
+from models import db, Student, QuizAttempt, Curriculum
+import rollups
+import ranking
+import counters
 from functools import wraps
+from sqlalchemy.orm import joinedload
 
 student_bp = Blueprint('student', __name__)
 
@@ -40,6 +44,7 @@ def create():
         
         try:
             db.session.add(student)
+            counters.increment(current_user.id, total_students=1)
             db.session.commit()
             flash('Öğrenci başarıyla eklendi.', 'success')
             return redirect(url_for('student.list'))
@@ -67,25 +72,37 @@ def view(id):
         return redirect(url_for('dashboard.index'))
         
     # Get student's quiz attempts and performance data
-    quiz_attempts = QuizAttempt.query.filter_by(student_id=student.id).order_by(QuizAttempt.completed_at.desc()).all()
+    quiz_attempts = QuizAttempt.query\
+        .filter_by(student_id=student.id)\
+        .options(joinedload(QuizAttempt.quiz))\
+        .order_by(QuizAttempt.completed_at.desc())\
+        .all()
     
-    # Calculate performance metrics
-    total_attempts = len(quiz_attempts)
-    if total_attempts > 0:
-        average_score = sum(attempt.score for attempt in quiz_attempts) / total_attempts
-        highest_score = max(attempt.score for attempt in quiz_attempts)
-        lowest_score = min(attempt.score for attempt in quiz_attempts)
-    else:
-        average_score = highest_score = lowest_score = 0
-        
+    # Performans özetleri deneme kaydedilirken güncellenen özet tablosundan okunur
+    summary = rollups.summary_for(rollups.SCOPE_STUDENT, student.id)
     performance_data = {
-        'total_attempts': total_attempts,
-        'average_score': average_score,
-        'highest_score': highest_score,
-        'lowest_score': lowest_score
+        'total_attempts': summary['attempts'] if summary else 0,
+        'average_score': summary['average'] if summary else 0,
+        'highest_score': summary['highest'] if summary else 0,
+        'lowest_score': summary['lowest'] if summary else 0
+    }
+    
+    # Sıralamalar öğretmen bazında önbelleklenir; yeni deneme gelene kadar yeniden hesaplanmaz
+    grade_rankings = ranking.rankings(current_user.id, ranking.BY_GRADE)
+    curriculum_rankings = ranking.rankings(current_user.id, ranking.BY_CURRICULUM)
+    curriculum_ids = [curriculum_id for curriculum_id, curriculum_ranking in curriculum_rankings.items()
+                      if student.id in curriculum_ranking]
+    titles = dict(db.session.query(Curriculum.id, Curriculum.title)
+                  .filter(Curriculum.id.in_(curriculum_ids)).all()) if curriculum_ids else {}
+    rankings = {
+        'teacher': ranking.rankings(current_user.id, ranking.BY_TEACHER).position(student.id),
+        'grade': grade_rankings[student.grade].position(student.id) if student.grade in grade_rankings else None,
+        'curricula': [(titles.get(curriculum_id), curriculum_rankings[curriculum_id].position(student.id))
+                      for curriculum_id in curriculum_ids]
     }
     
     return render_template('student/view.html', 
                          student=student, 
                          quiz_attempts=quiz_attempts,
-                         performance_data=performance_data)
+                         performance_data=performance_data,
+                         rankings=rankings)
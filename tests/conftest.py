@@ -0,0 +1,25 @@
+import os
+import pytest
+
+# app modül düzeyinde yapılandırıldığı için ortam değişkenleri içe aktarmadan önce ayarlanır
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('AI_BACKEND', 'fake')
+os.environ.setdefault('GOOGLE_OAUTH_CLIENT_ID', 'test')
+os.environ.setdefault('GOOGLE_OAUTH_CLIENT_SECRET', 'test')
+
+from app import app as flask_app
+
+@pytest.fixture
+def app():
+    # İstekler kendi uygulama bağlamlarında çalışır; testler veriyi ayrı bir bağlamda oluşturur
+    flask_app.config.update(TESTING=True)
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
@@ -0,0 +1,34 @@
+"""Performans eğilimi uç noktasının tarih parametreleri"""
+import uuid
+from app import db
+from models import User
+from conftest import login
+
+def _teacher():
+    prefix = uuid.uuid4().hex[:8]
+    teacher = User(username=f'{prefix}-teacher', email=f'{prefix}-teacher@example.com', is_teacher=True)
+    db.session.add(teacher)
+    db.session.commit()
+    return teacher.id
+
+def test_offset_aware_dates_are_converted_to_utc(app, client):
+    with app.app_context():
+        teacher_id = _teacher()
+    login(client, teacher_id)
+
+    aware = client.get('/analytics/performance_trends', query_string={
+        'start': '2026-01-01T03:00:00+03:00',
+        'end': '2026-01-03T00:00:00+00:00',
+        'cursor': '2026-01-02T00:00:00Z',
+        'bucket': 'day'
+    })
+    naive = client.get('/analytics/performance_trends', query_string={
+        'start': '2026-01-01T00:00:00',
+        'end': '2026-01-03T00:00:00',
+        'cursor': '2026-01-02T00:00:00',
+        'bucket': 'day'
+    })
+
+    assert aware.status_code == 200
+    assert aware.get_json() == naive.get_json()
+    assert aware.get_json()['start'] == '2026-01-02T00:00:00'
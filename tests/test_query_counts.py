@@ -0,0 +1,62 @@
+"""Analiz ve öğrenci sayfalarının SQL sorgu sayısı öğrenci sayısından bağımsız olmalı (N+1 gerilemesi)"""
+import uuid
+import pytest
+from app import db
+from models import User, Student, Curriculum, Quiz, Question, QuizAttempt
+from rollups import record_attempt
+from conftest import login
+
+def _create_class(student_count):
+    """Yeni bir öğretmen, öğrencileri ve puanlı denemeler oluştur
+
+    Quiz sayısı öğrenci sayısına eşittir ve her öğrenci her quizi bir kez çözer; böylece hem
+    sınıf hem de tek öğrencinin deneme sayısı büyür. Öğretmen ve öğrenci kimliklerini döndürür.
+    """
+    prefix = uuid.uuid4().hex[:8]
+    teacher = User(username=f'{prefix}-teacher', email=f'{prefix}-teacher@example.com', is_teacher=True)
+    db.session.add(teacher)
+    db.session.flush()
+
+    curriculum = Curriculum(title=f'{prefix} müfredat', content='<p>İçerik</p>', author_id=teacher.id)
+    db.session.add(curriculum)
+    db.session.flush()
+    quizzes = [Quiz(title=f'{prefix} quiz {index}', curriculum_id=curriculum.id) for index in range(student_count)]
+    db.session.add_all(quizzes)
+    db.session.flush()
+    for quiz in quizzes:
+        db.session.add(Question(quiz_id=quiz.id, question_text='Soru?', options=['A) 1', 'B) 2'], correct_answer='A) 1'))
+
+    students = []
+    for index in range(student_count):
+        email = f'{prefix}-student{index}@example.com'
+        user = User(username=f'{prefix}-student{index}', email=email)
+        student = Student(name=f'Öğrenci {index}', email=email, grade=str(5 + index % 3), teacher_id=teacher.id)
+        db.session.add_all([user, student])
+        db.session.flush()
+        for quiz_index, quiz in enumerate(quizzes):
+            attempt = QuizAttempt(user_id=user.id, quiz_id=quiz.id, student_id=student.id,
+                                  score=float((index * 7 + quiz_index * 13) % 100))
+            db.session.add(attempt)
+            db.session.flush()
+            record_attempt(attempt, teacher.id, curriculum.id)
+        students.append(student.id)
+
+    db.session.commit()
+    return teacher.id, students
+
+def _query_count(client, teacher_id, path):
+    login(client, teacher_id)
+    response = client.get(path)
+    assert response.status_code == 200
+    return int(response.headers['X-Query-Count'])
+
+@pytest.mark.parametrize('page', ['analytics', 'student'])
+def test_query_count_does_not_grow_with_students(app, client, page):
+    counts = []
+    for student_count in (1, 20):
+        with app.app_context():
+            teacher_id, student_ids = _create_class(student_count)
+        path = '/analytics' if page == 'analytics' else f'/student/{student_ids[0]}'
+        counts.append(_query_count(client, teacher_id, path))
+
+    assert counts[0] == counts[1], f"1 öğrenci: {counts[0]} sorgu, 20 öğrenci: {counts[1]} sorgu"
@@ -0,0 +1,164 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, literal_column
+from ai_cache import MemoryCache
+from models import db, QuizAttempt
+from analytics_queries import attempts_query
+
+BUCKETS = ('hour', 'day', 'week', 'month')
+LABEL_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+SQLITE_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+    'month': '%Y-%m-01 00:00:00',
+}
+# Eski period parametresi: (geriye gidilen süre, kova boyutu)
+PERIODS = {
+    'week': (timedelta(days=7), 'day'),
+    'month': (timedelta(days=30), 'day'),
+    'year': (timedelta(days=365), 'month'),
+}
+
+# Geçmiş (kapanmış) kovalar değişmez; yalnızca içinde bulunulan kova her istekte hesaplanır
+_closed_buckets = None
+
+def _cache():
+    global _closed_buckets
+    if _closed_buckets is None:
+        _closed_buckets = MemoryCache(
+            max_entries=int(current_app.config.get('TRENDS_CACHE_SIZE') or os.environ.get('TRENDS_CACHE_SIZE', 50000)),
+            ttl=int(current_app.config.get('TRENDS_CACHE_TTL') or os.environ.get('TRENDS_CACHE_TTL', 3600))
+        )
+    return _closed_buckets
+
+def floor_bucket(moment, bucket):
+    """Zamanı içinde bulunduğu kovanın başlangıcına yuvarla (haftalar pazartesi başlar)"""
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(moment, bucket):
+    if bucket == 'hour':
+        return moment + timedelta(hours=1)
+    if bucket == 'week':
+        return moment + timedelta(days=7)
+    if bucket == 'month':
+        return moment.replace(year=moment.year + 1, month=1) if moment.month == 12 else moment.replace(month=moment.month + 1)
+    return moment + timedelta(days=1)
+
+def bucket_starts(start, end, bucket, limit=None):
+    """[start, end) aralığındaki kova başlangıçları"""
+    current = floor_bucket(start, bucket)
+    starts = []
+    while current < end and (limit is None or len(starts) < limit):
+        starts.append(current)
+        current = next_bucket(current, bucket)
+    return starts
+
+def _bucket_expression(bucket):
+    column = QuizAttempt.completed_at
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Aynı ifade GROUP BY'da da kullanılabilsin diye kova adı parametre değil sabit olarak yazılır
+        return func.date_trunc(literal_column(f"'{bucket}'"), column)
+    if bucket == 'week':
+        return func.date(column, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+    return func.strftime(literal_column(f"'{SQLITE_FORMATS[bucket]}'"), column)
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+def _query_buckets(scope, student_ids, bucket, start, end):
+    """Kova (ve istenirse öğrenci) başına deneme sayısı ve puan toplamı
+
+    scope, analytics_queries.attempts_query filtreleridir (teacher_id veya student_id).
+    """
+    expression = _bucket_expression(bucket)
+    columns = [expression, func.count(QuizAttempt.id), func.sum(QuizAttempt.score)]
+    group_by = [expression]
+    if student_ids:
+        columns.insert(0, QuizAttempt.student_id)
+        group_by.insert(0, QuizAttempt.student_id)
+
+    query = attempts_query(*columns, **scope).filter(
+        QuizAttempt.completed_at >= start,
+        QuizAttempt.completed_at < end,
+        QuizAttempt.score.isnot(None)
+    )
+    if student_ids:
+        query = query.filter(QuizAttempt.student_id.in_(student_ids))
+
+    results = {}
+    for row in query.group_by(*group_by).all():
+        series = str(row[0]) if student_ids else 'all'
+        results[(series, _as_datetime(row[-3]))] = (row[-2], float(row[-1] or 0))
+    return results
+
+def bucket_series(scope, scope_key, student_ids, bucket, starts, end):
+    """Kova serilerini hesapla; kapanmış kovalar önbellekten gelir
+
+    scope_key önbellek anahtarında kapsamı (öğretmen veya öğrenci) ayırt eder.
+    Dönen değer seri anahtarından ('all' veya öğrenci kimliği) kova listesine eşlemedir.
+    """
+    cache = _cache()
+    series_keys = [str(student_id) for student_id in student_ids] or ['all']
+    open_start = floor_bucket(datetime.utcnow(), bucket)
+
+    def cache_key(series, bucket_start):
+        return f"{scope_key}:{series}:{bucket}:{bucket_start.isoformat()}"
+
+    values = {}
+    missing = []
+    for bucket_start in starts:
+        if bucket_start >= open_start:
+            continue
+        for series in series_keys:
+            cached = cache.get(cache_key(series, bucket_start))
+            if cached is None:
+                missing.append(bucket_start)
+                break
+            values[(series, bucket_start)] = cached
+
+    query_start = min(missing) if missing else open_start
+    if starts and query_start < end:
+        computed = _query_buckets(scope, student_ids, bucket, max(query_start, starts[0]), end)
+        for bucket_start in starts:
+            if bucket_start < query_start:
+                continue
+            for series in series_keys:
+                value = computed.get((series, bucket_start), (0, 0.0))
+                values[(series, bucket_start)] = value
+                if bucket_start < open_start:
+                    cache.set(cache_key(series, bucket_start), value)
+
+    label_format = LABEL_FORMATS[bucket]
+    result = {}
+    for series in series_keys:
+        points = []
+        for bucket_start in starts:
+            count, total = values.get((series, bucket_start), (0, 0.0))
+            if count:
+                points.append({
+                    'date': bucket_start.strftime(label_format),
+                    'start': bucket_start.isoformat(),
+                    'score': total / count,
+                    'attempts': count
+                })
+        result[series] = points
+    return result
+
+def etag(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()